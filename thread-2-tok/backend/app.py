@@ -1,64 +1,147 @@
-from flask import Flask, request, jsonify, send_file, Response
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import praw  # Python Reddit Wrapper
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from gtts import gTTS
-from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip
+import imageio_ffmpeg
 from dotenv import load_dotenv
+import orjson
 import os
 import random
+import re
+import hashlib
+import heapq
+import subprocess
+import tempfile
 import yaml
-from datetime import datetime, timezone
+import threading
+import time
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import math
+import numpy as np
 
 # Load environment variables
 load_dotenv()
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, which serializes large story lists much faster."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching
 CORS(app)  # Enable Cross-Origin Resource Sharing for React
 
+# Keep-alive connection pool shared by all PRAW requests, sized for the
+# concurrent listing fetches; transient gateway errors are retried with backoff
+http_session = requests.Session()
+http_session.mount('https://', HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    # raise_on_status=False hands the final response to prawcore's own error handling
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503], raise_on_status=False)
+))
+
 # Reddit API setup
 reddit = praw.Reddit(
     client_id=os.getenv("CLIENT_ID"),
     client_secret=os.getenv("CLIENT_SECRET"),
-    user_agent="thread-2-tok/0.1 by u/Complex_Balance4016"
+    user_agent="thread-2-tok/0.1 by u/Complex_Balance4016",
+    requestor_kwargs={"session": http_session}
 )
 
+# Reddit listings return up to 100 posts per request at the same latency as 10
+LISTING_PAGE_SIZE = 100
+
+# Background used by the video endpoint
+BACKGROUND_VIDEO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'minecraft_background.mp4')
+
+# Output resolution: TikTok 9:16
+OUTPUT_WIDTH = 1080
+OUTPUT_HEIGHT = 1920
+
+# H.264 encoders in order of preference; the first one ffmpeg was built with
+# is used, falling back to libx264 if a hardware encode fails
+VIDEO_ENCODERS = {
+    "h264_nvenc": ["-c:v", "h264_nvenc", "-preset", "p4", "-rc", "vbr", "-cq", "23"],
+    "h264_videotoolbox": ["-c:v", "h264_videotoolbox", "-b:v", "6M"],
+    "h264_vaapi": ["-c:v", "h264_vaapi"],
+    "libx264": ["-c:v", "libx264", "-preset", "veryfast"],
+}
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+# Title words that signal a hook in analyze_virality, matched as whole tokens
+HOOK_WORDS = frozenset({'aita', 'tifu', 'update', 'revenge', 'crazy', 'insane', 'shocking'})
+_TOKEN_RE = re.compile(r"\w+")
+
 # Load subreddit configuration with tags
 SUBREDDITS_FILE = os.path.join(os.path.dirname(__file__), 'subreddits.yaml')
 
-def load_subreddit_config():
-    """Load subreddit configuration from YAML file."""
+# Parsed YAML keyed by path: (mtime, size, config, tag_index, all_tags).
+# Re-parsed, and the tag index rebuilt, only when the file changes.
+_yaml_cache: dict[str, tuple[float, int, dict, dict, list]] = {}
+_yaml_cache_lock = threading.Lock()
+
+try:
+    _YamlLoader = yaml.CSafeLoader  # LibYAML-backed C parser
+except AttributeError:
+    _YamlLoader = yaml.SafeLoader
+
+def _build_tag_index(config):
+    """Map each tag to the subreddits carrying it (tags are already lowercase)."""
+    tag_index = {}
+    for subreddit, tags in config.items():
+        for tag in tags:
+            subs = tag_index.setdefault(tag, [])
+            if subreddit not in subs:
+                subs.append(subreddit)
+    return tag_index
+
+def _load_config_entry():
+    """Return (config, tag_index, all_tags) for the current subreddits.yaml."""
     try:
-        with open(SUBREDDITS_FILE, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f) or {}
+        st = os.stat(SUBREDDITS_FILE)
+        with _yaml_cache_lock:
+            cached = _yaml_cache.get(SUBREDDITS_FILE)
+            if cached and cached[0] == st.st_mtime and cached[1] == st.st_size:
+                return cached[2:]
+            with open(SUBREDDITS_FILE, 'r', encoding='utf-8') as f:
+                raw = yaml.load(f, Loader=_YamlLoader) or {}
+            # Store tags in canonical lowercase form so lookups never re-lowercase them
+            config = {sub: [str(t).lower() for t in tags] for sub, tags in raw.items()}
+            tag_index = _build_tag_index(config)
+            entry = (st.st_mtime, st.st_size, config, tag_index, sorted(tag_index))
+            _yaml_cache[SUBREDDITS_FILE] = entry
+            return entry[2:]
     except FileNotFoundError:
         print(f"Warning: {SUBREDDITS_FILE} not found. Using empty config.")
-        return {}
+        return {}, {}, []
     except yaml.YAMLError as e:
         print(f"Error parsing YAML: {e}")
-        return {}
+        return {}, {}, []
+
+def load_subreddit_config():
+    """Load subreddit configuration from YAML file, cached until the file changes."""
+    return _load_config_entry()[0]
 
-def get_subreddits_by_tag(tag, config=None):
+def get_subreddits_by_tag(tag):
     """Get list of subreddits that have the specified tag."""
-    if config is None:
-        config = load_subreddit_config()
-    matching = []
-    for subreddit, tags in config.items():
-        if tag.lower() in [t.lower() for t in tags]:
-            matching.append(subreddit)
-    return matching
+    return _load_config_entry()[1].get(tag.lower(), [])
 
-def get_all_tags(config=None):
+def get_all_tags():
     """Get all unique tags from the configuration."""
-    if config is None:
-        config = load_subreddit_config()
-    all_tags = set()
-    for tags in config.values():
-        all_tags.update([t.lower() for t in tags])
-    return sorted(all_tags)
-
-def calculate_virality_score(post):
+    return _load_config_entry()[2]
+
+def calculate_virality_score(post, now_ts=None):
     """
     Calculate a virality score (0-9) for a Reddit post based on multiple metrics.
     
@@ -70,13 +153,32 @@ def calculate_virality_score(post):
     - Post Length Score (optimal length for engagement): 10%
     
     Each metric is normalized to 0-9 scale before combining.
+
+    now_ts is the POSIX time to measure post age against; callers scoring a
+    batch should compute it once with _scoring_now() and pass it in.
     """
+    if now_ts is None:
+        now_ts = _scoring_now()
+    final_score, score_components = _score_impl(
+        post.score, post.num_comments, post.upvote_ratio,
+        len(post.selftext), post.created_utc, now_ts
+    )
+    # Copy so callers never share the cached breakdown dict
+    return final_score, dict(score_components)
+
+def _scoring_now():
+    """Current time rounded to the minute so repeat scorings hit the _score_impl cache."""
+    return round(time.time() / 60) * 60
+
+@functools.lru_cache(maxsize=4096)
+def _score_impl(score, num_comments, upvote_ratio, char_count, created_utc, now_ts):
+    """Pure virality scoring math behind calculate_virality_score."""
     score_components = {}
     
     # 1. Engagement Rate (comments to upvotes ratio)
     # Higher ratio = more engaging/discussion-worthy content
-    if post.score > 0:
-        engagement_ratio = post.num_comments / post.score
+    if score > 0:
+        engagement_ratio = num_comments / score
         # Normalize: 0.01 = low engagement, 0.1+ = very high engagement
         engagement_score = min(9, max(0, engagement_ratio * 90))
     else:
@@ -87,17 +189,17 @@ def calculate_virality_score(post):
     # Compare post score to typical subreddit performance
     # Assuming avg post has ~100 upvotes in these story subreddits
     avg_expected_score = 100
-    velocity_score = min(9, max(0, (post.score / avg_expected_score) * 4.5))
+    velocity_score = min(9, max(0, (score / avg_expected_score) * 4.5))
     score_components['velocity'] = velocity_score
     
     # 3. Upvote Ratio (quality indicator)
     # Higher ratio = less controversial, more universally liked
-    ratio_score = min(9, max(0, (post.upvote_ratio - 0.5) * 18))
+    ratio_score = min(9, max(0, (upvote_ratio - 0.5) * 18))
     score_components['quality'] = ratio_score
     
     # 4. Time Decay (freshness bonus)
-    # Newer posts get a slight boost
-    post_age_hours = (datetime.now(timezone.utc) - datetime.fromtimestamp(post.created_utc, tz=timezone.utc)).total_seconds() / 3600
+    # Newer posts get a slight boost; created_utc is already a POSIX timestamp
+    post_age_hours = (now_ts - created_utc) / 3600
     if post_age_hours < 2:
         freshness_score = 9
     elif post_age_hours < 6:
@@ -114,7 +216,6 @@ def calculate_virality_score(post):
     
     # 5. Post Length Score (optimal for TikTok narration)
     # Sweet spot: 500-2000 chars for ~1-3 minute videos
-    char_count = len(post.selftext)
     if 500 <= char_count <= 1500:
         length_score = 9
     elif 1500 < char_count <= 2500:
@@ -143,77 +244,225 @@ def calculate_virality_score(post):
     # Round to nearest integer and clamp to 0-9
     return round(min(9, max(0, final_score))), score_components
 
-def fetch_stories_by_tag(tag, limit=10, min_virality=0):
+# Bucket tables for _score_batch. searchsorted(side='right') counts the edges
+# <= value, which indexes the score for that bucket. Freshness buckets are
+# age-in-hours upper bounds; length edges are lower bounds on the integer
+# character count (500-1500 -> 9, 1501-2500 -> 8, ...).
+FRESH_EDGES = np.array([2, 6, 12, 24, 48])
+FRESH_SCORES = np.array([9, 8, 7, 6, 4, 2])
+LENGTH_EDGES = np.array([300, 500, 1501, 2501, 3501])
+LENGTH_SCORES = np.array([3, 6, 9, 8, 6, 4])
+
+def _score_batch(posts, now_ts):
+    """
+    Vectorized calculate_virality_score over a batch of posts.
+
+    Applies the same metrics and weights with NumPy array expressions instead
+    of per-post Python branches; the bucketed metrics are table lookups.
+    Returns a list of (score, components) tuples in the same order as posts.
+    """
+    if not posts:
+        return []
+
+    scores = np.array([post.score for post in posts], dtype=float)
+    comments = np.array([post.num_comments for post in posts], dtype=float)
+    ratios = np.array([post.upvote_ratio for post in posts], dtype=float)
+    chars = np.array([len(post.selftext) for post in posts])
+    created = np.array([post.created_utc for post in posts], dtype=float)
+
+    positive = scores > 0
+    engagement = np.where(positive, np.clip(comments / np.where(positive, scores, 1) * 90, 0, 9), 0)
+    velocity = np.clip(scores / 100 * 4.5, 0, 9)
+    quality = np.clip((ratios - 0.5) * 18, 0, 9)
+
+    ages_h = (now_ts - created) / 3600
+    freshness = FRESH_SCORES[np.searchsorted(FRESH_EDGES, ages_h, side='right')]
+    length = LENGTH_SCORES[np.searchsorted(LENGTH_EDGES, chars, side='right')]
+
+    final = engagement * 0.30 + velocity * 0.25 + quality * 0.20 + freshness * 0.15 + length * 0.10
+    virality = np.rint(np.clip(final, 0, 9)).astype(int)
+
+    return [
+        (v, {'engagement': e, 'velocity': vel, 'quality': q, 'freshness': f, 'length': l})
+        for v, e, vel, q, f, l in zip(
+            virality.tolist(), engagement.tolist(), velocity.tolist(),
+            quality.tolist(), freshness.tolist(), length.tolist()
+        )
+    ]
+
+def _wire_limit(desired):
+    """Round a post count up to whole listing pages; each page costs one round-trip either way."""
+    return -(-desired // LISTING_PAGE_SIZE) * LISTING_PAGE_SIZE
+
+def _is_story(post):
+    """True for self posts with enough text to narrate."""
+    return bool(post.selftext) and len(post.selftext) >= 100
+
+def _fetch_listing(subreddit_name, listing, limit):
+    """Fetch a single 'hot' or 'top' (day) listing for a subreddit or 'a+b' multireddit."""
+    subreddit = reddit.subreddit(subreddit_name)
+    if listing == 'top':
+        return list(subreddit.top(time_filter='day', limit=limit))
+    return list(subreddit.hot(limit=limit))
+
+def _fetch_stories(multi_name, listing, wanted, now_ts, tags_by_sub, min_virality):
+    """Fetch one listing and turn its qualifying posts into scored story dicts."""
+    posts = [post for post in _fetch_listing(multi_name, listing, _wire_limit(wanted)) if _is_story(post)][:wanted]
+    stories = []
+    for post, (virality_score, components) in zip(posts, _score_batch(posts, now_ts)):
+        if virality_score >= min_virality:
+            subreddit_name = post.subreddit.display_name
+            stories.append({
+                'title': post.title,
+                'body': post.selftext,
+                'subreddit': subreddit_name,
+                # .name comes from the listing payload; never triggers a Redditor fetch
+                'author': post.author.name if post.author else '[deleted]',
+                'score': post.score,
+                'upvote_ratio': post.upvote_ratio,
+                'num_comments': post.num_comments,
+                'url': f"https://reddit.com{post.permalink}",
+                'created_utc': post.created_utc,
+                'virality_score': virality_score,
+                'virality_breakdown': components,
+                'tags': tags_by_sub.get(subreddit_name.lower(), [])
+            })
+    return stories
+
+def fetch_stories_by_tag(tag, limit=10, min_virality=0, k=None):
     """
     Fetch stories from subreddits matching a tag, scored by virality.
     
     Args:
         tag: The tag to search for (e.g., 'horror', 'funny')
-        limit: Number of posts to fetch per subreddit
+        limit: Number of stories to keep per subreddit. This caps the
+            returned list, not the wire fetch: listings are pulled in full
+            pages and the qualifying stories are sliced from them.
         min_virality: Minimum virality score (0-9) to include
+        k: If set, return only the k highest-ranked stories
     
     Returns:
         List of story dicts with virality scores, sorted by score descending
     """
     config = load_subreddit_config()
-    subreddits = get_subreddits_by_tag(tag, config)
+    subreddits = get_subreddits_by_tag(tag)
     
     if not subreddits:
         return []
     
     stories = []
-    
-    for subreddit_name in subreddits:
-        try:
-            subreddit = reddit.subreddit(subreddit_name)
-            # Fetch from hot and top to get variety
-            posts = list(subreddit.hot(limit=limit)) + list(subreddit.top(time_filter='day', limit=limit//2))
-            
-            for post in posts:
-                if not post.selftext or len(post.selftext) < 100:
-                    continue
-                    
-                virality_score, components = calculate_virality_score(post)
-                
-                if virality_score >= min_virality:
-                    stories.append({
-                        'title': post.title,
-                        'body': post.selftext,
-                        'subreddit': subreddit_name,
-                        'author': str(post.author),
-                        'score': post.score,
-                        'upvote_ratio': post.upvote_ratio,
-                        'num_comments': post.num_comments,
-                        'url': f"https://reddit.com{post.permalink}",
-                        'created_utc': post.created_utc,
-                        'virality_score': virality_score,
-                        'virality_breakdown': components,
-                        'tags': config.get(subreddit_name, [])
-                    })
-        except Exception as e:
-            print(f"Error fetching from r/{subreddit_name}: {e}")
-            continue
-    
-    # Sort by virality score descending, then by upvotes
-    stories.sort(key=lambda x: (x['virality_score'], x['score']), reverse=True)
+    # Listing subreddit names may differ in case from the YAML keys
+    tags_by_sub = {name.lower(): config.get(name, []) for name in subreddits}
+
+    # One 'a+b+c' multireddit request per listing instead of two per subreddit.
+    # Fetch from hot and top to get variety; each worker also scores and formats
+    # its own listing, so one listing's parsing overlaps the other's network time
+    multi_name = "+".join(subreddits)
+    now_ts = _scoring_now()
+    wanted = {'hot': limit * len(subreddits), 'top': (limit // 2) * len(subreddits)}
+    with ThreadPoolExecutor(max_workers=len(wanted)) as ex:
+        futures = {
+            ex.submit(_fetch_stories, multi_name, listing, count, now_ts, tags_by_sub, min_virality): listing
+            for listing, count in wanted.items()
+        }
+        for future in as_completed(futures):
+            if future.exception():
+                print(f"Error fetching {futures[future]} from r/{multi_name}: {future.exception()}")
+                continue
+            stories.extend(future.result())
+    
+    # Sort by virality score descending, then by upvotes; a partial
+    # O(N log k) selection is enough when only the top k are wanted
+    rank = lambda x: (x['virality_score'], x['score'])
+    if k is not None:
+        return heapq.nlargest(k, stories, key=rank)
+    stories.sort(key=rank, reverse=True)
     
     return stories
 
+# Per-tag story lists, scored and sorted by a background thread so the tag
+# endpoints can answer without waiting on Reddit. Only requests using the
+# default limit are served from it, since that is what it holds.
+# The cache and its refresher are per process: under a multi-worker server
+# each worker polls Reddit on its own, so the refresher stops (and the cache
+# is dropped) once no tag request has come in for STORY_REFRESH_IDLE_SECONDS.
+DEFAULT_STORY_LIMIT = 10
+STORY_REFRESH_SECONDS = 60
+STORY_REFRESH_IDLE_SECONDS = 600
+# Replaced wholesale by the refresher, never mutated, so readers need no lock
+_tag_cache: dict[str, list] = {}
+_last_tag_request = 0.0
+_refresher_started = False
+_refresher_lock = threading.Lock()
+
+def _refresh_tag_cache():
+    """Background loop: periodically re-fetch and score every tag's stories."""
+    global _tag_cache, _refresher_started
+    while True:
+        with _refresher_lock:
+            if time.monotonic() - _last_tag_request > STORY_REFRESH_IDLE_SECONDS:
+                # Idle: stop polling; the next tag request starts a new refresher
+                _tag_cache = {}
+                _refresher_started = False
+                return
+        previous = _tag_cache
+        # Built from the current tags only, so tags removed from
+        # subreddits.yaml drop out of the cache on this pass
+        fresh = {}
+        for tag in get_all_tags():
+            try:
+                stories = fetch_stories_by_tag(tag, limit=DEFAULT_STORY_LIMIT)
+            except Exception as e:
+                print(f"Error refreshing stories for tag '{tag}': {e}")
+                stories = None
+            # Keep serving the previous list if this refresh failed or came back empty
+            stories = stories or previous.get(tag)
+            if stories:
+                fresh[tag] = stories
+        _tag_cache = fresh
+        time.sleep(STORY_REFRESH_SECONDS)
+
+def _ensure_story_refresher():
+    """Start the background refresher if it is not running, and mark this request."""
+    global _refresher_started, _last_tag_request
+    _last_tag_request = time.monotonic()
+    with _refresher_lock:
+        if not _refresher_started:
+            threading.Thread(target=_refresh_tag_cache, daemon=True).start()
+            _refresher_started = True
+
+def get_stories_for_tag(tag, limit=DEFAULT_STORY_LIMIT, min_virality=0, k=None):
+    """fetch_stories_by_tag, answered from the background cache when possible."""
+    _ensure_story_refresher()
+    tag = tag.lower()
+    # The config check also covers tags removed before the refresher's next pass
+    cached = None
+    if limit == DEFAULT_STORY_LIMIT and tag in _load_config_entry()[1]:
+        cached = _tag_cache.get(tag)
+    if cached is None:
+        return fetch_stories_by_tag(tag, limit=limit, min_virality=min_virality, k=k)
+    # Cached lists are already sorted best-first
+    stories = [s for s in cached if s['virality_score'] >= min_virality]
+    return stories[:k] if k is not None else stories
+
 def fetch_story(subreddit="AmItheAsshole", prefer_high_virality=True):
     """
     Fetch a story from a subreddit, optionally prioritizing high virality.
     """
     subreddit_obj = reddit.subreddit(subreddit)
-    posts = [post for post in subreddit_obj.hot(limit=20) if post.selftext and len(post.selftext) >= 100]
+    posts = [post for post in subreddit_obj.hot(limit=LISTING_PAGE_SIZE) if _is_story(post)][:20]
     
     if not posts:
         return None
     
+    # One clock read for the whole listing rather than one per post
+    now_ts = _scoring_now()
+    
     if prefer_high_virality:
         # Score all posts and pick the best one
         scored_posts = []
         for post in posts:
-            score, _ = calculate_virality_score(post)
+            score, _ = calculate_virality_score(post, now_ts)
             scored_posts.append((post, score))
         
         # Sort by virality score and pick top 3, then random from those
@@ -222,7 +471,7 @@ def fetch_story(subreddit="AmItheAsshole", prefer_high_virality=True):
         selected_post, virality = random.choice(top_posts)
     else:
         selected_post = random.choice(posts)
-        virality, _ = calculate_virality_score(selected_post)
+        virality, _ = calculate_virality_score(selected_post, now_ts)
     
     config = load_subreddit_config()
     
@@ -237,65 +486,195 @@ def fetch_story(subreddit="AmItheAsshole", prefer_high_virality=True):
         "tags": config.get(subreddit, [])
     }
 
+# Narration MP3s are cached on disk by text hash; oldest files are evicted past the cap
+TTS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tts_cache')
+TTS_CACHE_MAX_FILES = 200
+
+def _evict_tts_cache():
+    """Delete the least recently used narrations beyond TTS_CACHE_MAX_FILES."""
+    entries = [e for e in os.scandir(TTS_CACHE_DIR) if e.name.endswith('.mp3')]
+    if len(entries) <= TTS_CACHE_MAX_FILES:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:len(entries) - TTS_CACHE_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
 # Helper function to generate narration audio
-def generate_narration(text, output_file="narration.mp3"):
-    """Generate audio from text using gTTS and save as an MP3."""
+def generate_narration(text, *, lang="en"):
+    """
+    Generate audio from text using gTTS and return the path to the MP3.
+    Identical (text, lang) pairs reuse the cached file instead of calling gTTS again.
+    """
     try:
-        output_file = os.path.join(os.getcwd(), output_file)
-        tts = gTTS(text)
-        tts.save(output_file)
-        return output_file
+        os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+        key = hashlib.blake2b(f"{lang}\0{text}".encode('utf-8'), digest_size=16).hexdigest()
+        cached_file = os.path.join(TTS_CACHE_DIR, f"{key}.mp3")
+        if os.path.exists(cached_file):
+            os.utime(cached_file)  # Mark as recently used for eviction
+            return cached_file
+
+        # Write under a temporary name so concurrent readers never see a partial file
+        partial_file = f"{cached_file}.{os.getpid()}.{threading.get_ident()}.part"
+        tts = gTTS(text, lang=lang)
+        try:
+            tts.save(partial_file)
+            os.replace(partial_file, cached_file)
+        except Exception:
+            # Eviction only sees finished .mp3 files, so don't leave the partial behind
+            try:
+                os.remove(partial_file)
+            except OSError:
+                pass
+            raise
+        _evict_tts_cache()
+        return cached_file
     except Exception as e:
         print(f"Error generating narration: {e}")
         return None
 
+def _probe_media(path):
+    """
+    Read (duration, width, height) of a media file from ffmpeg's stream info.
+    Uses the imageio-ffmpeg binary (which ships without ffprobe); width and
+    height are None for audio-only files.
+    """
+    result = subprocess.run(
+        [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-i", path],
+        capture_output=True, text=True, errors="replace"
+    )
+    info = result.stderr
+    duration_match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", info)
+    if not duration_match:
+        raise ValueError(f"Could not read duration of {path}")
+    hours, minutes, seconds = duration_match.groups()
+    duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    size_match = re.search(r"Stream #\S+.*Video: .*?\b(\d{2,5})x(\d{2,5})\b", info)
+    if not size_match:
+        return duration, None, None
+    return duration, int(size_match.group(1)), int(size_match.group(2))
+
+# Background videos are static, so (duration, width, height) is probed once per path
+_video_meta_cache: dict[str, tuple[float, int, int]] = {}
+
+def _probe_video(path):
+    """Return cached (duration, width, height) for a background video."""
+    meta = _video_meta_cache.get(path)
+    if meta is None:
+        meta = _video_meta_cache[path] = _probe_media(path)
+    return meta
+
+_video_encoder = None
+
+def _encoder_works(encoder):
+    """
+    Encode a single blank frame with `encoder`. Builds often list hardware
+    encoders (e.g. h264_nvenc) that fail at once without the matching GPU.
+    """
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error"]
+    video_filter = "format=yuv420p"
+    if encoder == "h264_vaapi":
+        cmd += ["-vaapi_device", VAAPI_DEVICE]
+        video_filter = "format=nv12,hwupload"
+    cmd += [
+        "-f", "lavfi", "-i", "nullsrc=s=256x256:d=1", "-frames:v", "1",
+        "-vf", video_filter, *VIDEO_ENCODERS[encoder], "-f", "null", "-"
+    ]
+    try:
+        return subprocess.run(cmd, capture_output=True, timeout=30).returncode == 0
+    except subprocess.TimeoutExpired:
+        return False
+
+def _get_video_encoder():
+    """Detect the best working H.264 encoder once and cache it."""
+    global _video_encoder
+    if _video_encoder is None:
+        result = subprocess.run(
+            [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-encoders"],
+            capture_output=True, text=True, errors="replace"
+        )
+        available = set(re.findall(r"^\s*V\S*\s+(\S+)", result.stdout, re.MULTILINE))
+        for encoder in VIDEO_ENCODERS:
+            if encoder == "h264_vaapi" and not os.path.exists(VAAPI_DEVICE):
+                continue
+            # libx264 comes last and is always usable
+            if encoder == "libx264" or (encoder in available and _encoder_works(encoder)):
+                _video_encoder = encoder
+                break
+    return _video_encoder
+
+def _build_video_cmd(input_video_file, input_audio_file, output_target, encoder="libx264", output_args=()):
+    """
+    Build the ffmpeg command that seeks to a random slice of the background,
+    crops it to 9:16, scales to OUTPUT_WIDTH x OUTPUT_HEIGHT and muxes in the
+    narration, all in a single decode/encode pass. output_args are inserted
+    just before output_target (e.g. muxer flags for piping).
+    """
+    audio_duration, _, _ = _probe_media(input_audio_file)
+    video_duration, video_width, video_height = _probe_video(input_video_file)
+
+    # Select a random video slice as long as the narration; a background
+    # shorter than the narration is looped (-t below cuts it to length)
+    if video_duration >= audio_duration:
+        start_time = random.uniform(0, video_duration - audio_duration)
+        loop_args = []
+    else:
+        start_time = random.uniform(0, video_duration)
+        loop_args = ["-stream_loop", "-1"]
+
+    # Crop video to fit TikTok's 9:16 aspect ratio
+    target_aspect_ratio = 9 / 16
+    current_aspect_ratio = video_width / video_height
+
+    if current_aspect_ratio > target_aspect_ratio:
+        # Crop width (landscape video)
+        crop_w, crop_h = int(video_height * target_aspect_ratio), video_height
+    else:
+        # Crop height (portrait video)
+        crop_w, crop_h = video_width, int(video_width / target_aspect_ratio)
+    crop_x = (video_width - crop_w) // 2
+    crop_y = (video_height - crop_h) // 2
+    video_filter = f"crop={crop_w}:{crop_h}:{crop_x}:{crop_y},scale={OUTPUT_WIDTH}:{OUTPUT_HEIGHT},setsar=1"
+
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-y"]
+    if encoder == "h264_vaapi":
+        # VAAPI encodes from GPU surfaces, so upload the filtered frames
+        cmd += ["-vaapi_device", VAAPI_DEVICE]
+        video_filter += ",format=nv12,hwupload"
+    return cmd + [
+        # -ss before -i seeks the input instead of decoding up to start_time
+        *loop_args, "-ss", f"{start_time:.3f}", "-i", input_video_file,
+        "-i", input_audio_file,
+        "-t", f"{audio_duration:.3f}",
+        "-filter_complex", f"[0:v]{video_filter}[v]",
+        "-map", "[v]", "-map", "1:a",
+        *VIDEO_ENCODERS[encoder],
+        "-c:a", "aac",
+        "-shortest",
+        *output_args,
+        output_target
+    ]
+
 # Helper function to create a TikTok-compatible video
 def create_video(input_video_file, input_audio_file, output_file):
     """Creates a TikTok-style video with a 9:16 aspect ratio and overlays the audio."""
     try:
+        global _video_encoder
         output_path = os.path.join(os.getcwd(), output_file)
-
-        # Load video and audio
-        video = VideoFileClip(input_video_file)
-        audio = AudioFileClip(input_audio_file)
-
-        # Calculate audio duration and select a video slice
-        audio_duration = audio.duration
-        max_start_time = max(0, video.duration - audio_duration)
-        start_time = random.uniform(0, max_start_time)
-        end_time = start_time + audio_duration
-        video_slice = video.subclip(start_time, end_time)
-
-        # Crop video to fit TikTok's 9:16 aspect ratio
-        target_aspect_ratio = 9 / 16
-        video_width, video_height = video_slice.size
-        current_aspect_ratio = video_width / video_height
-
-        if current_aspect_ratio > target_aspect_ratio:
-            # Crop width (landscape video)
-            new_width = int(video_height * target_aspect_ratio)
-            crop_x1 = (video_width - new_width) // 2
-            crop_x2 = crop_x1 + new_width
-            video_cropped = video_slice.crop(x1=crop_x1, x2=crop_x2)
-        else:
-            # Crop height (portrait video)
-            new_height = int(video_width / target_aspect_ratio)
-            crop_y1 = (video_height - new_height) // 2
-            crop_y2 = crop_y1 + new_height
-            video_cropped = video_slice.crop(y1=crop_y1, y2=crop_y2)
-
-        # Add audio to the cropped video
-        video_with_audio = video_cropped.set_audio(audio)
-
-        # Write the final video
-        video_with_audio.write_videofile(
-            output_path,
-            codec="libx264",
-            audio_codec="aac",
-            temp_audiofile="temp-audio.m4a",
-            remove_temp=True,
-            fps=24
-        )
+        encoder = _get_video_encoder()
+        cmd = _build_video_cmd(input_video_file, input_audio_file, output_path, encoder)
+        try:
+            subprocess.run(cmd, check=True, capture_output=True)
+        except subprocess.CalledProcessError:
+            if encoder == "libx264":
+                raise
+            # Encoder is compiled in but the device is unusable; stick to software
+            print(f"Hardware encoder {encoder} failed, falling back to libx264")
+            _video_encoder = "libx264"
+            cmd = _build_video_cmd(input_video_file, input_audio_file, output_path, "libx264")
+            subprocess.run(cmd, check=True, capture_output=True)
 
         # Ensure the file exists before returning
         return output_path if os.path.exists(output_path) else None
@@ -327,14 +706,11 @@ def get_stories_by_tag_endpoint(tag):
     - min_virality: Minimum virality score 0-9 (default: 0)
     - top_only: If true, return only the single highest-virality story
     """
-    limit = request.args.get('limit', 10, type=int)
+    limit = request.args.get('limit', DEFAULT_STORY_LIMIT, type=int)
     min_virality = request.args.get('min_virality', 0, type=int)
     top_only = request.args.get('top_only', 'false').lower() == 'true'
     
-    stories = fetch_stories_by_tag(tag, limit=limit, min_virality=min_virality)
-    
-    if top_only and stories:
-        stories = [stories[0]]
+    stories = get_stories_for_tag(tag, limit=limit, min_virality=min_virality, k=1 if top_only else None)
     
     return jsonify({
         "tag": tag,
@@ -358,7 +734,7 @@ def get_random_story():
     
     if tag:
         # Fetch by tag and pick best one
-        stories = fetch_stories_by_tag(tag, limit=10, min_virality=0)
+        stories = get_stories_for_tag(tag, k=1)
         if not stories:
             return jsonify({"error": f"No stories found for tag '{tag}'"}), 404
         story = stories[0]  # Already sorted by virality
@@ -369,6 +745,73 @@ def get_random_story():
         return jsonify(story)
     return jsonify({"error": "No story found"}), 404
 
+@app.route('/api/video', methods=['POST'])
+def stream_video():
+    """
+    Narrate a story over the background video and stream the MP4 as it encodes.
+    
+    Body: {"title": "...", "body": "..."}
+    ffmpeg writes fragmented MP4 to stdout, which is relayed to the client
+    chunk by chunk, so the download starts before the encode finishes.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+    
+    narration_text = f"{data.get('title', '')} {data.get('body', '')}".strip()
+    if not narration_text:
+        return jsonify({"error": "No story text provided"}), 400
+    if not os.path.exists(BACKGROUND_VIDEO):
+        return jsonify({"error": "Background video not found"}), 500
+    
+    # Probe the background while gTTS runs; the result is cached for _build_video_cmd
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        narration_future = ex.submit(generate_narration, narration_text)
+        ex.submit(_probe_video, BACKGROUND_VIDEO)
+    narration_path = narration_future.result()
+    if not narration_path:
+        return jsonify({"error": "Narration failed"}), 500
+    
+    # Fragmented MP4 needs no seek-back to write the moov atom, so it can go to a pipe
+    try:
+        cmd = _build_video_cmd(
+            BACKGROUND_VIDEO, narration_path, "pipe:1", _get_video_encoder(),
+            output_args=("-movflags", "frag_keyframe+empty_moov", "-f", "mp4")
+        )
+    except Exception as e:
+        print(f"Error preparing video: {e}")
+        return jsonify({"error": "Could not read background video or narration"}), 500
+    # Log only errors, to a file rather than a pipe nobody drains during the stream
+    cmd[1:1] = ["-hide_banner", "-loglevel", "error"]
+    stderr_log = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_log)
+    
+    # Only commit to a 200 once ffmpeg is actually producing output
+    first_chunk = proc.stdout.read1(65536)
+    if not first_chunk:
+        proc.stdout.close()
+        proc.wait()
+        stderr_log.seek(0)
+        error = stderr_log.read().decode(errors='replace').strip()
+        stderr_log.close()
+        print(f"Error streaming video: ffmpeg exited with code {proc.returncode}: {error}")
+        return jsonify({"error": "Video encoding failed"}), 500
+    
+    def generate():
+        try:
+            yield first_chunk
+            while chunk := proc.stdout.read(65536):
+                yield chunk
+        finally:
+            # Client may disconnect mid-stream; don't leave ffmpeg running
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            stderr_log.close()
+    
+    return Response(stream_with_context(generate()), mimetype='video/mp4')
+
 @app.route('/api/virality/analyze', methods=['POST'])
 def analyze_virality():
     """
@@ -388,7 +831,7 @@ def analyze_virality():
     # Simple text-based virality indicators
     char_count = len(body)
     word_count = len(body.split())
-    has_hook = any(word in title.lower() for word in ['aita', 'tifu', 'update', 'revenge', 'crazy', 'insane', 'shocking'])
+    has_hook = not HOOK_WORDS.isdisjoint(_TOKEN_RE.findall(title.lower()))
     
     # Score based on length and hooks
     if 500 <= char_count <= 1500:
@@ -429,16 +872,20 @@ if __name__ == "__main__":
 
         # File paths
         input_video = os.path.join(os.getcwd(), "backend/static/minecraft_background.mp4")  # Path to test video
-        input_audio = os.path.join(os.getcwd(), "narration.mp3")  # Path to generated narration audio
         output_video = os.path.join(os.getcwd(), "generated_video.mp4")  # Output video file name
 
-        # Generate narration audio from the fetched story
-        narration_path = generate_narration(narration_text, input_audio)
+        # Generate narration audio from the fetched story while probing the
+        # background video; the probe is cached for create_video
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            narration_future = ex.submit(generate_narration, narration_text)
+            if os.path.exists(input_video):
+                ex.submit(_probe_video, input_video)
+        narration_path = narration_future.result()
 
         # Create the video with the narration audio
         if narration_path and os.path.exists(input_video):
             print("Creating video...")
-            video_path = create_video(input_video, input_audio, output_video)
+            video_path = create_video(input_video, narration_path, output_video)
             if video_path:
                 print(f"Video successfully created: {video_path}")
             else:
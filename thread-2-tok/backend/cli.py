@@ -2,20 +2,41 @@
 """
 Reddit Story Selector CLI
 Interactive console application for selecting subreddits and stories by virality score.
+
+Usage: python cli.py [--refresh]
+  --refresh  ignore today's cached story lists and re-fetch from Reddit
 """
 
+import hashlib
+import io
 import os
 import random
+import re
+import shlex
+import subprocess
 import sys
+import threading
+import time
 import yaml
 import praw
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
+from operator import itemgetter
+from pathlib import Path
 from dotenv import load_dotenv
+try:
+    import orjson
+except ImportError:  # stdlib fallback, just slower
+    orjson = None
+    import json
 from video_generator import (
     generate_video, list_background_videos, VOICE_OPTIONS,
-    DURATION_MODES, estimate_duration_seconds
+    DURATION_MODES, estimate_duration_seconds, clean_markdown, preload_models
 )
 
+# Reverse lookup for callers that only know a duration mode's label
+_LABEL_TO_KEY = {v['label']: k for k, v in DURATION_MODES.items()}
+
 # Load environment variables
 load_dotenv()
 
@@ -32,41 +53,74 @@ SUBREDDITS_FILE = os.path.join(os.path.dirname(__file__), 'subreddits.yaml')
 POPULAR_FETCH_TARGET = 10000   # per feed pull – totals ~30k stories per sub
 NICHE_FETCH_TARGET = 10000
 PAGE_SIZE = 10
+SEARCH_SCAN_LIMIT = 50  # posts scanned by search_subreddit (one listing request)
+SEARCH_RESULTS = 15     # text posts it keeps before stopping
 MIN_COMMENTS = 50
-
-def load_subreddit_config():
-    """Load subreddit configuration from YAML file."""
+PAGER_THRESHOLD = 40  # listings longer than this go through $PAGER
+# Fetched story lists, keyed by query and UTC day; --refresh bypasses them
+STORY_CACHE_DIR = Path.home() / '.cache' / 'thread2tok'
+STORY_CACHE_MAX_AGE = 6 * 3600
+FETCH_WORKERS = 16  # concurrent listing requests; keeps us under Reddit's rate limit
+BATCH_RENDER_WORKERS = 3  # parallel batch renders; more just fight over disk and encoder
+
+# Parsed subreddits.yaml keyed by path, as (mtime, size, config, tag_index, all_tags)
+_yaml_cache: dict[str, tuple[float, int, dict, dict, list]] = {}
+_yaml_cache_lock = threading.Lock()
+
+try:
+    _YamlLoader = yaml.CSafeLoader  # LibYAML-backed C parser
+except AttributeError:
+    _YamlLoader = yaml.SafeLoader
+
+def _build_tag_index(config):
+    """Map each lowercased tag to the sorted subreddits carrying it."""
+    tag_index = {}
+    for subreddit, tags in config.items():
+        for tag in tags:
+            # str() in case YAML parses a tag as another type (e.g. a boolean)
+            subs = tag_index.setdefault(str(tag).lower(), [])
+            if subreddit not in subs:
+                subs.append(subreddit)
+    for subs in tag_index.values():
+        subs.sort()
+    return tag_index
+
+
+def _load_config_entry():
+    """Return (config, tag_index, all_tags) for the current subreddits.yaml."""
     try:
-        with open(SUBREDDITS_FILE, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f) or {}
+        st = os.stat(SUBREDDITS_FILE)
+        with _yaml_cache_lock:
+            cached = _yaml_cache.get(SUBREDDITS_FILE)
+            if cached and cached[0] == st.st_mtime and cached[1] == st.st_size:
+                return cached[2:]
+            with open(SUBREDDITS_FILE, 'r', encoding='utf-8') as f:
+                config = yaml.load(f, Loader=_YamlLoader) or {}
+            tag_index = _build_tag_index(config)
+            entry = (st.st_mtime, st.st_size, config, tag_index, sorted(tag_index))
+            _yaml_cache[SUBREDDITS_FILE] = entry
+            return entry[2:]
     except FileNotFoundError:
         print(f"Warning: {SUBREDDITS_FILE} not found. Using empty config.")
-        return {}
+        return {}, {}, []
     except yaml.YAMLError as e:
         print(f"Error parsing YAML: {e}")
-        return {}
+        return {}, {}, []
 
 
-def get_all_tags(config=None):
+def load_subreddit_config():
+    """Load subreddit configuration from YAML file, cached until the file changes."""
+    return _load_config_entry()[0]
+
+
+def get_all_tags():
     """Get all unique tags from the configuration."""
-    if config is None:
-        config = load_subreddit_config()
-    all_tags = set()
-    for tags in config.values():
-        # Convert all tags to strings in case YAML parses them as other types (e.g., booleans)
-        all_tags.update([str(t).lower() for t in tags])
-    return sorted(all_tags)
+    return _load_config_entry()[2]
 
 
-def get_subreddits_by_tag(tag, config=None):
+def get_subreddits_by_tag(tag):
     """Get list of subreddits that have the specified tag."""
-    if config is None:
-        config = load_subreddit_config()
-    matching = []
-    for subreddit, tags in config.items():
-        if tag.lower() in [str(t).lower() for t in tags]:
-            matching.append(subreddit)
-    return matching
+    return _load_config_entry()[1].get(tag.lower(), [])
 
 
 def _normalize(value, peak):
@@ -78,7 +132,8 @@ def calculate_virality_score(post):
     upvotes = max(0, post.score)
     comments = max(0, post.num_comments)
     awards = max(0, getattr(post, 'total_awards_received', 0))
-    age_hours = (datetime.now(timezone.utc) - datetime.fromtimestamp(post.created_utc, tz=timezone.utc)).total_seconds() / 3600
+    # created_utc is already epoch seconds; no need to build datetimes per post
+    age_hours = (time.time() - post.created_utc) / 3600
 
     comment_score = _normalize(comments, 400)  # 400+ comments -> 1.0
     vote_score = _normalize(upvotes, 20000)
@@ -106,67 +161,148 @@ def calculate_virality_score(post):
     return score, breakdown
 
 
-def _build_story_dict(post, subreddit_name, config):
-    """Helper to build a story dict from a PRAW post object."""
+def _author_name(post):
+    """Username from the listing's author field; '[deleted]' when the account is gone."""
+    author = post.author
+    return author.name if author else '[deleted]'
+
+
+def _build_story_dict(post, subreddit_name, config, preview_chars=300, body=None):
+    """Helper to build a story dict from a PRAW post object.
+    Pass body when the caller already read the selftext."""
     virality_score, breakdown = calculate_virality_score(post)
-    full_text = f"{post.title}. {post.selftext}"
+    score = post.score
+    # Read each field once; PRAW proxies attribute access through __getattr__
+    title = post.title
+    selftext = post.selftext if body is None else body
+    full_text = f"{title}. {selftext}"
     return {
-        'title': post.title,
-        'body': post.selftext[:300] + '...' if len(post.selftext) > 300 else post.selftext,
-        'full_body': post.selftext,
+        'title': title,
+        'body': selftext[:preview_chars] + '...' if len(selftext) > preview_chars else selftext,
+        'full_body': selftext,
         'subreddit': subreddit_name,
-        'author': str(post.author),
-        'score': post.score,
+        'author': _author_name(post),
+        'score': score,
         'upvote_ratio': post.upvote_ratio,
         'num_comments': post.num_comments,
         'url': f'https://reddit.com{post.permalink}',
         'created_utc': post.created_utc,
         'virality_score': virality_score,
         'virality_breakdown': breakdown,
+        # Ascending order on this is best-first: highest virality, then most upvotes
+        '_sort_key': (-virality_score, -score),
         'estimated_seconds': estimate_duration_seconds(full_text),
         'tags': config.get(subreddit_name, [])
     }
 
 
+# C-level key getter for sorting story dicts best-first
+_sort_key = itemgetter('_sort_key')
+
+
+# Fields _build_story_dict reads; a Submission missing any of them would
+# trigger its own lazy /api/info request on first access.
+_STORY_FIELDS = (
+    'title', 'selftext', 'author', 'score', 'upvote_ratio', 'num_comments',
+    'total_awards_received', 'permalink', 'created_utc',
+)
+INFO_BATCH_SIZE = 100  # fullnames per /api/info request
+
+
+def _hydrate_posts(posts):
+    """Refetch posts missing listing fields in batched /api/info calls."""
+    missing = [p for p in posts if not all(f in vars(p) for f in _STORY_FIELDS)]
+    hydrated = {}
+    for i in range(0, len(missing), INFO_BATCH_SIZE):
+        chunk = missing[i:i + INFO_BATCH_SIZE]
+        try:
+            for post in reddit.info(fullnames=[f"t3_{p.id}" for p in chunk]):
+                hydrated[post.id] = post
+        except Exception as e:
+            # Fall back to PRAW's per-post lazy loading for this chunk
+            print(f"  Could not batch-load {len(chunk)} posts: {e}")
+    if not hydrated:
+        return posts
+    return [hydrated.get(p.id, p) for p in posts]
+
+
 # Subreddits with large enough post volumes to support wider scraping
-_POPULAR_SUBS = {
+# (stored lowercase so membership is checked against subreddit_name.lower())
+_POPULAR_SUBS = frozenset(name.lower() for name in (
     'amItheasshole', 'relationship_advice', 'tifu', 'askreddit',
     'nosleep', 'antiwork', 'offmychest', 'trueoffmychest',
     'maliciouscompliance', 'pettyrevenge', 'prorevenge', 'confession',
     'confessions', 'funny', 'todayilearned',
-}
+))
 
 
-def _fetch_sub_posts(sub, limit):
-    """Pull posts from multiple feeds until we approach the desired volume."""
-    seen = set()
-    posts = []
-
-    feeds = [
-        lambda l: sub.hot(limit=l),
-        lambda l: sub.top(time_filter='week', limit=l),
-        lambda l: sub.top(time_filter='month', limit=l),
-        lambda l: sub.top(time_filter='year', limit=max(10, l // 2)),
-        lambda l: sub.new(limit=max(10, l // 2)),
+def _feed_tasks(sub, limit):
+    """One callable per feed, each pulling a single listing into a list."""
+    per_feed = min(100, max(50, limit))
+    return [
+        lambda: list(sub.hot(limit=per_feed)),
+        lambda: list(sub.top(time_filter='week', limit=per_feed)),
+        lambda: list(sub.top(time_filter='month', limit=per_feed)),
+        lambda: list(sub.top(time_filter='year', limit=max(10, per_feed // 2))),
+        lambda: list(sub.new(limit=max(10, per_feed // 2))),
     ]
 
-    per_feed = min(100, max(50, limit))
 
-    for fetch in feeds:
+def _dumps(obj):
+    """Serialize to JSON bytes, via orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str).encode('utf-8')
+
+
+def _loads(data):
+    """Parse JSON bytes, via orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _story_cache_path(tag, min_virality, duration_cap):
+    """Cache file for one (tag, min virality, length cap) query on the current UTC day."""
+    day = datetime.now(timezone.utc).strftime('%Y%m%d')
+    return STORY_CACHE_DIR / f"stories_{tag}_{min_virality}_{duration_cap or 'any'}_{day}.json"
+
+
+def fetch_stories_by_tag(tag, min_virality=0, max_seconds=None, allow_split=False, refresh=False):
+    """
+    Fetch stories for a tag, reusing today's results from the on-disk cache
+    when they are less than STORY_CACHE_MAX_AGE old (unless refresh is set,
+    i.e. the CLI was run with --refresh).
+    """
+    duration_cap = max_seconds if (max_seconds and not allow_split) else None
+    path = _story_cache_path(tag, min_virality, duration_cap)
+    if not refresh:
         try:
-            for p in fetch(per_feed):
-                if p.id in seen:
-                    continue
-                seen.add(p.id)
-                posts.append(p)
-                if len(posts) >= limit:
-                    return posts
-        except Exception:
-            continue
-    return posts
+            if time.time() - path.stat().st_mtime < STORY_CACHE_MAX_AGE:
+                stories = _loads(path.read_bytes())
+                # JSON has no tuples; restore the sort key so cached and
+                # freshly built story dicts are identical
+                for story in stories:
+                    story['_sort_key'] = tuple(story['_sort_key'])
+                print(f"  Loaded {len(stories)} cached stories (run with --refresh to re-fetch)")
+                return stories
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # missing, unreadable or outdated cache; fetch fresh
+
+    stories = _fetch_stories_from_reddit(tag, min_virality, max_seconds, allow_split)
+    if stories:
+        try:
+            STORY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Per-process temp name so concurrent runs never share a partial file
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.part")
+            tmp_path.write_bytes(_dumps(stories))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"  Could not write story cache: {e}")
+    return stories
 
 
-def fetch_stories_by_tag(tag, min_virality=0, max_seconds=None, allow_split=False):
+def _fetch_stories_from_reddit(tag, min_virality=0, max_seconds=None, allow_split=False):
     """
     Fetch stories from all subreddits matching a tag.
     Popular subs: hot+top(week/month/year)+new with limit=50 -> ~150-200 candidates.
@@ -174,72 +310,116 @@ def fetch_stories_by_tag(tag, min_virality=0, max_seconds=None, allow_split=Fals
     If nothing meets min_virality, returns the best available anyway.
     """
     config = load_subreddit_config()
-    subreddits = get_subreddits_by_tag(tag, config)
+    subreddits = get_subreddits_by_tag(tag)
 
     if not subreddits:
         print(f"No subreddits found with tag '{tag}'")
         return []
 
     stories = []
-    seen_ids = set()
+    candidates = []
+    posts_by_id = {}  # every post id pulled so far, across all feeds
+    seen_hashes: set[bytes] = set()
 
     duration_cap = max_seconds if (max_seconds and not allow_split) else None
     skipped_by_length = 0
     skipped_by_comments = 0
 
-    for subreddit_name in subreddits:
-        try:
+    # Every (subreddit, feed) listing is an independent blocking request, so
+    # issue them all at once and process whichever comes back first.
+    sub_limits = {}
+    sub_counts = {}
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        futures = {}
+        for subreddit_name in subreddits:
             sub = reddit.subreddit(subreddit_name)
             is_popular = subreddit_name.lower() in _POPULAR_SUBS
             limit = POPULAR_FETCH_TARGET if is_popular else NICHE_FETCH_TARGET
             # Increase limits for girly tags
-            if tag in ['girly_general', 'girly_targeted'] and subreddit_name.lower() in [s.lower() for s in _POPULAR_SUBS]:
+            if tag in ['girly_general', 'girly_targeted'] and is_popular:
                 limit = max(limit, 500)  # Increase popular subs for girly
             elif tag == 'girly_targeted':
                 limit = max(limit, 200)  # Increase niche women subs
+            sub_limits[subreddit_name] = limit
+            sub_counts[subreddit_name] = 0
             print(f"  Fetching r/{subreddit_name} ({'popular' if is_popular else 'niche'}, limit={limit})...")
-            feed = _fetch_sub_posts(sub, limit)
-            for post in feed:
-                if post.id in seen_ids:
-                    continue
-                if not post.selftext or post.selftext.strip() in ('', '[removed]', '[deleted]'):
-                    continue
-                if post.num_comments < MIN_COMMENTS:
-                    skipped_by_comments += 1
-                    continue
-                seen_ids.add(post.id)
-                story = _build_story_dict(post, subreddit_name, config)
-                # Apply girly filter for girly_general tag only
-                if tag == 'girly_general':
-                    title_lower = story['title'].lower()
-                    female_patterns = [
-                        r'\bf\d+',  # F25, F 25, etc.
-                        r'\bfemale',  # Female
-                        r'\bwoman',  # Woman
-                        r'\bgirl',  # Girl
-                        r'\d+\s*f\b',  # 25F, 25 F
-                        r'\(f[^m]',  # (F, (F25, not (M
-                        r'^\s*f\d+',  # F25 at start
-                        r'^\s*female',  # Female at start
-                    ]
-                    import re
-                    # Must match female pattern AND not match male pattern
-                    has_female = any(re.search(pattern, title_lower) for pattern in female_patterns)
-                    has_male = re.search(r'\bm\d+', title_lower) or re.search(r'\bmale', title_lower) or re.search(r'\(m', title_lower)
-                    if not has_female or has_male:
+            for fetch in _feed_tasks(sub, limit):
+                futures[pool.submit(fetch)] = subreddit_name
+
+        for future in as_completed(futures):
+            subreddit_name = futures[future]
+            try:
+                feed = future.result()
+            except Exception:
+                # A failing feed just contributes nothing, same as before
+                continue
+            try:
+                for post in feed:
+                    if sub_counts[subreddit_name] >= sub_limits[subreddit_name]:
+                        break
+                    # One hash per post: setdefault both checks and records the id
+                    if posts_by_id.setdefault(post.id, post) is not post:
+                        continue
+                    sub_counts[subreddit_name] += 1
+                    # Cheap flag checks first, so link posts and pinned mod
+                    # threads never touch (or strip) the body text
+                    if getattr(post, 'stickied', False) or not getattr(post, 'is_self', True):
                         continue
-                if duration_cap and story['estimated_seconds'] > duration_cap:
-                    skipped_by_length += 1
+                    body = post.selftext
+                    if not body:
+                        continue
+                    stripped = body.strip()
+                    if not stripped or stripped in ('[removed]', '[deleted]'):
+                        continue
+                    if post.num_comments < MIN_COMMENTS:
+                        skipped_by_comments += 1
+                        continue
+                    # Crossposts/reposts get new ids, so also dedupe on the text
+                    # itself; the first 2 KB identifies a story well enough
+                    digest = hashlib.blake2b(stripped[:2048].encode('utf-8', errors='ignore'), digest_size=16).digest()
+                    if digest in seen_hashes:
+                        continue
+                    seen_hashes.add(digest)
+                    candidates.append((post, subreddit_name, body))
+            except Exception as e:
+                print(f"  Skipping r/{subreddit_name}: {e}")
+                continue
+
+    posts = _hydrate_posts([post for post, _, _ in candidates])
+    for post, (_, subreddit_name, body) in zip(posts, candidates):
+        try:
+            # Author comes from the (hydrated) listing data, never a lazy Redditor fetch
+            story = _build_story_dict(post, subreddit_name, config, body=body)
+            # Apply girly filter for girly_general tag only
+            if tag == 'girly_general':
+                title_lower = story['title'].lower()
+                female_patterns = [
+                    r'\bf\d+',  # F25, F 25, etc.
+                    r'\bfemale',  # Female
+                    r'\bwoman',  # Woman
+                    r'\bgirl',  # Girl
+                    r'\d+\s*f\b',  # 25F, 25 F
+                    r'\(f[^m]',  # (F, (F25, not (M
+                    r'^\s*f\d+',  # F25 at start
+                    r'^\s*female',  # Female at start
+                ]
+                # Must match female pattern AND not match male pattern
+                has_female = any(re.search(pattern, title_lower) for pattern in female_patterns)
+                has_male = re.search(r'\bm\d+', title_lower) or re.search(r'\bmale', title_lower) or re.search(r'\(m', title_lower)
+                if not has_female or has_male:
                     continue
-                stories.append(story)
+            if duration_cap and story['estimated_seconds'] > duration_cap:
+                skipped_by_length += 1
+                continue
+            stories.append(story)
         except Exception as e:
-            print(f"  Skipping r/{subreddit_name}: {e}")
+            print(f"  Skipping post {post.id} from r/{subreddit_name}: {e}")
             continue
 
     print(f"  Total kept: {len(stories)} | skipped short-comments: {skipped_by_comments} | over-length: {skipped_by_length}")
 
     # Sort best first
-    stories.sort(key=lambda x: (x['virality_score'], x['score']), reverse=True)
+    stories.sort(key=_sort_key)
 
     # Filter by min_virality - but if nothing passes, return best available with a warning
     filtered = [s for s in stories if s['virality_score'] >= min_virality]
@@ -252,21 +432,20 @@ def fetch_stories_by_tag(tag, min_virality=0, max_seconds=None, allow_split=Fals
 
 def display_tags():
     """Display all available tags."""
-    config = load_subreddit_config()
-    tags = get_all_tags(config)
+    tags = get_all_tags()
     
     print("\n" + "="*50)
     print("AVAILABLE TAGS")
     print("="*50)
     
     for i, tag in enumerate(tags, 1):
-        subreddits = get_subreddits_by_tag(tag, config)
+        subreddits = get_subreddits_by_tag(tag)
         print(f"{i:2}. {tag:15} ({len(subreddits)} subreddits)")
     
     return tags
 
 
-def display_stories(stories, max_seconds=120, duration_label="Under 2 minutes", offset=0, randomize=False):
+def display_stories(stories, max_seconds=120, duration_label="Under 2 minutes", offset=0, randomize=False, allow_split=None):
     """Display up to PAGE_SIZE stories (sequential or random)."""
     if not stories:
         print("\nNo stories found matching criteria.")
@@ -283,20 +462,23 @@ def display_stories(stories, max_seconds=120, duration_label="Under 2 minutes",
             return None
         showing_end = min(offset + PAGE_SIZE, len(stories))
         offset_label = f"STORIES {offset+1}-{showing_end} of {len(stories)}"
-    print("\n" + "="*80)
-    print(f"{offset_label}  |  Mode: {duration_label}")
-    print("="*80)
+    buf = io.StringIO()
+    print("\n" + "="*80, file=buf)
+    print(f"{offset_label}  |  Mode: {duration_label}", file=buf)
+    print("="*80, file=buf)
 
-    allow_split_mode = DURATION_MODES.get(
-        next((k for k, v in DURATION_MODES.items() if v['label'] == duration_label), "1"), {}
-    ).get('allow_split', False)
+    if allow_split is None:
+        allow_split = DURATION_MODES.get(_LABEL_TO_KEY.get(duration_label, "1"), {}).get('allow_split', False)
 
     for i, story in enumerate(page, 1):
         vb = story['virality_breakdown']
 
-        raw = f"{story['title']}. {story.get('full_body', story['body'])}"
-        est_secs = estimate_duration_seconds(raw)
-        if allow_split_mode:
+        # _build_story_dict already estimated this; only compute it for stories built elsewhere
+        est_secs = story.get('estimated_seconds')
+        if est_secs is None:
+            raw = f"{story['title']}. {story.get('full_body', story['body'])}"
+            est_secs = story['estimated_seconds'] = estimate_duration_seconds(raw)
+        if allow_split:
             parts = max(1, int(est_secs // max_seconds) + (1 if est_secs % max_seconds > 5 else 0))
         else:
             if est_secs > max_seconds:
@@ -304,18 +486,21 @@ def display_stories(stories, max_seconds=120, duration_label="Under 2 minutes",
             parts = 1
         parts_label = f"videos: {parts}"
 
-        print(f"\n{'='*80}")
-        print(f"[{i}]  VIRALITY: {story['virality_score']}/9  |  r/{story['subreddit']}  |  {duration_label} -> {parts_label}")
-        print(f"{'='*80}")
-        print(f"TITLE:   {story['title']}")
-        print(f"AUTHOR:  u/{story['author']}")
-        print(f"STATS:   {story['score']} upvotes | {story['num_comments']} comments | {story['upvote_ratio']*100:.0f}% upvoted | {vb['awards']} awards")
+        print(f"\n{'='*80}", file=buf)
+        print(f"[{i}]  VIRALITY: {story['virality_score']}/9  |  r/{story['subreddit']}  |  {duration_label} -> {parts_label}", file=buf)
+        print(f"{'='*80}", file=buf)
+        print(f"TITLE:   {story['title']}", file=buf)
+        print(f"AUTHOR:  u/{story['author']}", file=buf)
+        print(f"STATS:   {story['score']} upvotes | {story['num_comments']} comments | {story['upvote_ratio']*100:.0f}% upvoted | {vb['awards']} awards", file=buf)
         est_mins = est_secs / 60
-        print(f"TOTAL INTERACTIONS: {vb['total_interactions']:,} | EST. LENGTH: ~{est_mins:.1f} min")
-        print(f"PREVIEW:")
+        print(f"TOTAL INTERACTIONS: {vb['total_interactions']:,} | EST. LENGTH: ~{est_mins:.1f} min", file=buf)
+        print(f"PREVIEW:", file=buf)
         preview = story['body'][:300] if len(story['body']) > 300 else story['body']
-        print(f"  \"{preview}\"")
-        print(f"{'-'*80}")
+        print(f"  \"{preview}\"", file=buf)
+        print(f"{'-'*80}", file=buf)
+
+    # One write per page instead of a print (and TTY flush) per line
+    _write_output(buf.getvalue())
 
     return page
 
@@ -457,8 +642,8 @@ def _select_duration_mode():
     return choice, mode['max_seconds'], mode['label'], mode['allow_split']
 
 
-def browse_by_tag():
-    """Browse stories by selecting a tag."""
+def browse_by_tag(refresh=False):
+    """Browse stories by selecting a tag. refresh bypasses the story cache."""
 
     # Ask duration preference before fetching — used for part-count labels
     # and passed straight through to video generation
@@ -480,7 +665,7 @@ def browse_by_tag():
             print("Invalid number.")
             return
     else:
-        if tag_input in [t.lower() for t in tags]:
+        if tag_input in tags:  # tags are already lowercased by the config index
             selected_tag = tag_input
         else:
             print("Invalid tag name.")
@@ -494,6 +679,7 @@ def browse_by_tag():
         min_virality=min_virality,
         max_seconds=max_seconds,
         allow_split=allow_split,
+        refresh=refresh,
     )
 
     if not stories:
@@ -509,6 +695,7 @@ def browse_by_tag():
             duration_label=duration_label,
             offset=offset,
             randomize=random_mode,
+            allow_split=allow_split,
         )
         if not page:
             print("No more stories to show.")
@@ -562,16 +749,38 @@ def browse_by_tag():
             continue
 
 
+def _write_output(text, paged=False):
+    """Write a block of output at once, through $PAGER if asked and on a terminal."""
+    if paged and sys.stdout.isatty():
+        pager = shlex.split(os.environ.get('PAGER') or ('more' if os.name == 'nt' else 'less -R'))
+        try:
+            proc = subprocess.Popen(pager, stdin=subprocess.PIPE)
+            try:
+                proc.stdin.write(text.encode(sys.stdout.encoding or 'utf-8', errors='replace'))
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass  # user quit the pager early
+            proc.wait()
+            return
+        except OSError:
+            pass  # no usable pager; fall back to plain output
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
 def list_all_subreddits():
     """Display all subreddits and their tags."""
     config = load_subreddit_config()
     
-    print("\n" + "="*50)
-    print("ALL SUBREDDITS")
-    print("="*50)
+    buf = io.StringIO()
+    print("\n" + "="*50, file=buf)
+    print("ALL SUBREDDITS", file=buf)
+    print("="*50, file=buf)
     
     for subreddit, tags in sorted(config.items()):
-        print(f"r/{subreddit:20} - tags: {', '.join(tags)}")
+        print(f"r/{subreddit:20} - tags: {', '.join(tags)}", file=buf)
+
+    _write_output(buf.getvalue(), paged=len(config) > PAGER_THRESHOLD)
 
 
 def search_subreddit():
@@ -584,31 +793,21 @@ def search_subreddit():
     
     try:
         subreddit = reddit.subreddit(subreddit_name)
-        posts = list(subreddit.hot(limit=15))
+        config = load_subreddit_config()
         
+        # Walk the listing lazily and stop once we have enough text posts,
+        # rather than materializing every post up front
         stories = []
-        for post in posts:
-            if not post.selftext or len(post.selftext) < 100:
+        for post in subreddit.hot(limit=SEARCH_SCAN_LIMIT):
+            body = post.selftext
+            if not body or len(body) < 100:
                 continue
             
-            virality_score, components = calculate_virality_score(post)
-            stories.append({
-                'title': post.title,
-                'body': post.selftext[:200] + "..." if len(post.selftext) > 200 else post.selftext,
-                'full_body': post.selftext,
-                'subreddit': subreddit_name,
-                'author': str(post.author),
-                'score': post.score,
-                'upvote_ratio': post.upvote_ratio,
-                'num_comments': post.num_comments,
-                'url': f"https://reddit.com{post.permalink}",
-                'created_utc': post.created_utc,
-                'virality_score': virality_score,
-                'virality_breakdown': components,
-                'tags': load_subreddit_config().get(subreddit_name, [])
-            })
+            stories.append(_build_story_dict(post, subreddit_name, config, preview_chars=200, body=body))
+            if len(stories) >= SEARCH_RESULTS:
+                break
         
-        stories.sort(key=lambda x: (x['virality_score'], x['score']), reverse=True)
+        stories.sort(key=_sort_key)
         top_stories = display_stories(stories)
         
         if top_stories:
@@ -620,6 +819,14 @@ def search_subreddit():
         print(f"Error accessing r/{subreddit_name}: {e}")
 
 
+def _render_one(args):
+    """Process-pool entry point: render one story and return its output paths."""
+    story, voice_key, bg_filename, max_seconds, allow_split = args
+    # The batch pool already runs one story per core; render its parts serially
+    return generate_video(story, voice_key, bg_filename, max_seconds=max_seconds, allow_split=allow_split,
+                          workers=1)
+
+
 def generate_video_interactive(story=None, stories=None, duration_key=None, allow_split=False):
     """Interactive video generation flow: pick voice, background, render.
     If duration_key is provided (pre-selected at browse time), skip asking again.
@@ -637,10 +844,7 @@ def generate_video_interactive(story=None, stories=None, duration_key=None, allo
     else:
         stories_to_render = [story]
         # Estimate story length upfront
-        import re as _re
-        raw_text = f"{story['title']}. {story['full_body']}"
-        raw_text = _re.sub(r'\*+|#+\s*|\[.*?\]\(.*?\)', '', raw_text)
-        raw_text = _re.sub(r'\n+', ' ', raw_text).strip()
+        raw_text = clean_markdown(f"{story['title']}. {story['full_body']}")
         estimated_secs = estimate_duration_seconds(raw_text)
         estimated_mins = estimated_secs / 60
         print(f"\nEstimated story length: ~{estimated_mins:.1f} minutes ({int(estimated_secs)}s)")
@@ -711,16 +915,33 @@ def generate_video_interactive(story=None, stories=None, duration_key=None, allo
             print("Cancelled.")
             return
 
-        print("\nStarting batch render...")
+        total = len(stories_to_render)
+        workers = min(BATCH_RENDER_WORKERS, os.cpu_count() or 1, total)
+        print(f"\nStarting batch render ({workers} at a time)...")
         all_outputs = []
-        for i, s in enumerate(stories_to_render, 1):
-            print(f"\n[{i}/{len(stories_to_render)}] Rendering: {s['title'][:50]}...")
-            outputs = generate_video(s, voice_key, bg_filename, max_seconds=max_seconds, allow_split=allow_split)
-            if outputs:
-                all_outputs.extend(outputs)
-                print(f"  -> {len(outputs)} video(s) saved")
-            else:
-                print(f"  -> FAILED")
+        done = 0
+        # Each story renders in its own process (TTS, Whisper and encoding are
+        # independent), so results arrive in completion order, not list order
+        # Each worker loads Whisper once up front, not inside its first render
+        with ProcessPoolExecutor(max_workers=workers, initializer=preload_models) as pool:
+            futures = {}
+            for s in stories_to_render:
+                print(f"  Queued: {s['title'][:50]}...")
+                futures[pool.submit(_render_one, (s, voice_key, bg_filename, max_seconds, allow_split))] = s
+            for future in as_completed(futures):
+                s = futures[future]
+                done += 1
+                try:
+                    outputs = future.result()
+                except Exception as e:
+                    print(f"  Render process error: {e}")
+                    outputs = []
+                print(f"\n[{done}/{total}] {s['title'][:50]}...")
+                if outputs:
+                    all_outputs.extend(outputs)
+                    print(f"  -> {len(outputs)} video(s) saved")
+                else:
+                    print(f"  -> FAILED")
         
         if all_outputs:
             print(f"\nBatch complete! {len(all_outputs)} total video(s) saved:")
@@ -744,6 +965,7 @@ def generate_video_interactive(story=None, stories=None, duration_key=None, allo
             return
 
         print("\nGenerating video... (this may take a few minutes)")
+        preload_models()
         output_paths = generate_video(story, voice_key, bg_filename, max_seconds=max_seconds, allow_split=allow_split)
 
         if output_paths:
@@ -778,7 +1000,7 @@ def save_story_to_file(story):
 
 if __name__ == "__main__":
     try:
-        browse_by_tag()
+        browse_by_tag(refresh='--refresh' in sys.argv[1:])
     except KeyboardInterrupt:
         print("\n\nGoodbye!")
         sys.exit(0)
@@ -1,33 +1,54 @@
-from moviepy.editor import VideoFileClip, AudioFileClip
+"""
+Manual check for cutting a random background slice and muxing narration over it.
+
+-ss goes before the video's -i so ffmpeg seeks via the container index
+instead of decoding from the start of the file.
+"""
+
 import random
+import re
+import subprocess
+import imageio_ffmpeg
+
+FFMPEG = imageio_ffmpeg.get_ffmpeg_exe()
+
+def get_duration(path):
+    """Read a media file's duration from ffmpeg's stream info (imageio-ffmpeg has no ffprobe)."""
+    info = subprocess.run([FFMPEG, "-hide_banner", "-i", path], capture_output=True, text=True, errors="replace").stderr
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", info)
+    if not match:
+        raise ValueError(f"Could not read duration of {path}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
 
 def create_video_with_audio(input_video_file, input_audio_file, output_file):
     """Creates a video slice matching the audio duration and overlays the audio."""
     try:
-        # Load the video file
-        video = VideoFileClip(input_video_file)
-        
-        # Load the audio file
-        audio = AudioFileClip(input_audio_file)
-        
-        # Get the duration of the audio file
-        audio_duration = audio.duration
+        # Get the durations of both inputs
+        video_duration = get_duration(input_video_file)
+        audio_duration = get_duration(input_audio_file)
         
         # Ensure video duration is sufficient for the audio
-        max_start_time = max(0, video.duration - audio_duration)
+        max_start_time = max(0, video_duration - audio_duration)
         
         # Randomly select a start time for the video slice
         start_time = random.uniform(0, max_start_time)
-        end_time = start_time + audio_duration
-        
-        # Create a subclip of the video
-        video_slice = video.subclip(start_time, end_time)
-        
-        # Overlay the audio onto the video
-        video_with_audio = video_slice.set_audio(audio)
         
-        # Save the final video
-        video_with_audio.write_videofile(output_file, codec="libx264", audio_codec="aac")
+        # Slice the video and mux in the audio in one ffmpeg pass
+        base_cmd = [
+            FFMPEG, "-y", "-hide_banner", "-loglevel", "error",
+            "-ss", f"{start_time:.3f}", "-i", input_video_file, "-i", input_audio_file,
+            "-map", "0:v", "-map", "1:a", "-t", f"{audio_duration:.3f}",
+        ]
+        try:
+            # Stream copy: no decode or encode at all
+            subprocess.run(base_cmd + ["-c", "copy", "-shortest", output_file], check=True)
+        except subprocess.CalledProcessError:
+            # Container/codec refused the copy; re-encode as fast as possible
+            subprocess.run(
+                base_cmd + ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", output_file],
+                check=True
+            )
         print(f"Video with audio created successfully: {output_file}")
     except Exception as e:
         print(f"Error creating video with audio: {e}")
@@ -39,4 +60,4 @@ if __name__ == "__main__":
     output_video = "test_video_with_audio.mp4"
 
     # Create the video with audio overlay
-    create_video_with_audio(input_video, input_audio, output_video)
\ No newline at end of file
+    create_video_with_audio(input_video, input_audio, output_video)
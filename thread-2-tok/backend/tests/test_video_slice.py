@@ -1,19 +1,39 @@
-from moviepy.editor import VideoFileClip
+"""
+Manual check for slicing a background video with ffmpeg.
 
-def create_video_slice(input_file, output_file, start_time, duration):
-    """Creates a short slice of the video."""
+Keep -ss *before* -i: as an input option ffmpeg seeks straight to the
+nearest keyframe via the container index, so the cost doesn't grow with
+the source length. After -i it decodes everything up to the start point.
+"""
+
+import subprocess
+import imageio_ffmpeg
+
+# How far before the requested start to input-seek in accurate mode; covers
+# the keyframe interval of our background clips
+ACCURATE_SEEK_MARGIN = 2.0
+
+def create_video_slice(input_file, output_file, start_time, duration, accurate=False):
+    """
+    Creates a short slice of the video.
+    By default the slice is stream-copied (no re-encode) and starts on the
+    keyframe at or before start_time. With accurate=True, ffmpeg input-seeks
+    to just before start_time, then output-seeks the remainder and re-encodes,
+    so the cut is frame-exact while still decoding at most a couple of seconds.
+    """
     try:
-        # Load the video file
-        video = VideoFileClip(input_file)
-        
-        # Calculate end time
-        end_time = min(start_time + duration, video.duration)
-        
-        # Create a subclip
-        video_slice = video.subclip(start_time, end_time)
-        
-        # Save the sliced video
-        video_slice.write_videofile(output_file, codec="libx264")
+        if accurate:
+            coarse = max(0.0, start_time - ACCURATE_SEEK_MARGIN)
+            seek_args = ["-ss", f"{coarse}", "-i", input_file, "-ss", f"{start_time - coarse}"]
+            codec_args = ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac"]
+        else:
+            seek_args = ["-ss", f"{start_time}", "-i", input_file]
+            codec_args = ["-c", "copy"]
+        subprocess.run(
+            [imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+             *seek_args, "-t", f"{duration}", *codec_args, output_file],
+            check=True
+        )
         print(f"Video slice created successfully: {output_file}")
     except Exception as e:
         print(f"Error creating video slice: {e}")
@@ -28,4 +48,4 @@ if __name__ == "__main__":
     slice_duration = 10  # Duration of the slice in seconds
 
     # Create the video slice
-    create_video_slice(input_video, output_video, start, slice_duration)
\ No newline at end of file
+    create_video_slice(input_video, output_video, start, slice_duration)
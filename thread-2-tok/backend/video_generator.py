@@ -2,22 +2,25 @@
 Video Generator Module
 Handles TTS, subtitle generation, and video composition for Reddit story videos.
 Output: 1080x1920 (9:16) YouTube Shorts / TikTok format.
-Uses moviepy 2.x API.
+Rendering is done by the imageio-ffmpeg binary in a single filter graph.
 """
 
+import functools
+import hashlib
+import json
 import os
 import re
 import random
+import subprocess
+import tempfile
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import accumulate
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 from gtts import gTTS
 import imageio_ffmpeg
-from moviepy import (
-    VideoFileClip, AudioFileClip, CompositeVideoClip,
-    ImageClip, concatenate_videoclips
-)
-import whisper
 
 # Directories
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -28,9 +31,15 @@ OUTPUT_DIR = os.path.join(os.path.dirname(BACKEND_DIR), 'output_videos')
 OUTPUT_WIDTH = 1080
 OUTPUT_HEIGHT = 1920
 
-# Font path - full path required on Windows for Pillow/moviepy
+# Font path - full path required on Windows for Pillow
 FONT_PATH = 'C:/Windows/Fonts/impact.ttf'
 
+SUBTITLE_FONT_SIZE = 66
+
+# Parts of a split story render in parallel; half the cores, since each
+# ffmpeg encode is already multi-threaded
+PART_RENDER_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+
 # gTTS speaks ~150 words per minute
 WORDS_PER_MINUTE = 150
 
@@ -75,12 +84,46 @@ def list_background_videos():
     return [f for f in os.listdir(BG_VIDEO_DIR) if f.lower().endswith(exts)]
 
 
+# Markdown noise in Reddit posts, stripped in this order: emphasis stars,
+# heading hashes, [text](url) links. Later passes see the earlier passes'
+# output (e.g. "[text]**(url)" is only a link once the stars are gone), so
+# the patterns are applied one after another, not as one alternation.
+_MD_PASSES = (
+    re.compile(r'\*+'),
+    re.compile(r'#+\s*'),
+    re.compile(r'\[.*?\]\(.*?\)'),
+)
+_NL_COLLAPSE = re.compile(r'\n+')
+
+
+def clean_markdown(text):
+    """Strip markdown markup and collapse newlines so text reads cleanly aloud."""
+    for pattern in _MD_PASSES:
+        text = pattern.sub('', text)
+    return _NL_COLLAPSE.sub(' ', text).strip()
+
+
 def estimate_duration_seconds(text):
     """Estimate TTS duration in seconds based on word count at ~150 wpm."""
     word_count = len(text.split())
     return (word_count / WORDS_PER_MINUTE) * 60
 
 
+_SENT_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+def _split_sentences(text):
+    """
+    Split text into sentences and running word totals: cum[i] is the
+    number of words in sentences[:i], so any sentence range's length is
+    one subtraction and cut points can be found with bisect.
+    """
+    sentences = _SENT_RE.split(text.strip())
+    cum = [0]
+    cum.extend(accumulate(len(sentence.split()) for sentence in sentences))
+    return sentences, cum
+
+
 def split_text_into_parts(text, max_seconds):
     """
     Split narration text into parts that each fit within max_seconds.
@@ -88,26 +131,18 @@ def split_text_into_parts(text, max_seconds):
     Returns a list of text strings, one per part.
     """
     max_words = int((max_seconds / 60) * WORDS_PER_MINUTE)
+    sentences, cum = _split_sentences(text)
+    if not cum[-1]:
+        return []
 
-    # Split into sentences first
-    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
     parts = []
-    current_words = []
-    current_count = 0
-
-    for sentence in sentences:
-        s_words = sentence.split()
-        if current_count + len(s_words) > max_words and current_words:
-            parts.append(' '.join(current_words))
-            current_words = s_words
-            current_count = len(s_words)
-        else:
-            current_words.extend(s_words)
-            current_count += len(s_words)
-
-    if current_words:
-        parts.append(' '.join(current_words))
-
+    i = 0
+    while i < len(sentences):
+        # Furthest sentence end that stays within budget; always take at
+        # least one sentence, even if it alone is over
+        j = max(i + 1, bisect_right(cum, cum[i] + max_words) - 1)
+        parts.append(' '.join(sentences[i:j]))
+        i = j
     return parts
 
 
@@ -117,123 +152,175 @@ def _truncate_to_duration(text, max_seconds):
     Always returns at least one sentence so the video is never empty.
     """
     max_words = int((max_seconds / 60) * WORDS_PER_MINUTE)
-    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-    kept = []
-    count = 0
-    for sentence in sentences:
-        w = len(sentence.split())
-        if count + w > max_words and kept:
-            break
-        kept.append(sentence)
-        count += w
-    return ' '.join(kept) if kept else sentences[0]
+    sentences, cum = _split_sentences(text)
+    return ' '.join(sentences[:max(1, bisect_right(cum, max_words) - 1)])
 
 
 # Narration playback speed multiplier (1.5 = 50% faster, matching TikTok pacing)
 NARRATION_SPEED = 1.5
 
 
-def _speed_up_audio(input_path, output_path, speed=NARRATION_SPEED):
+def _atempo_filter(speed=NARRATION_SPEED):
     """
-    Speed up audio by `speed` factor using ffmpeg's atempo filter.
-    Uses the imageio-ffmpeg binary directly — no system ffmpeg needed.
+    Build the ffmpeg atempo chain that plays audio `speed` times faster.
+    Applied in the final mux, so the narration is encoded only once.
     atempo supports 0.5-2.0; chain two filters for speeds > 2.0.
     """
-    ffmpeg_bin = imageio_ffmpeg.get_ffmpeg_exe()
-    # Build atempo filter chain (each atempo capped at 2.0)
     if speed <= 2.0:
-        atempo = f"atempo={speed}"
-    else:
-        # e.g. 3x = atempo=2.0,atempo=1.5
-        atempo = f"atempo=2.0,atempo={speed/2.0:.4f}"
-    cmd = [
-        ffmpeg_bin, "-y",
-        "-i", input_path,
-        "-filter:a", atempo,
-        "-vn",
-        output_path
-    ]
-    import subprocess
-    subprocess.run(cmd, check=True, capture_output=True)
+        return f"atempo={speed}"
+    # e.g. 3x = atempo=2.0,atempo=1.5
+    return f"atempo=2.0,atempo={speed/2.0:.4f}"
 
 
-def generate_tts(text, voice_key, output_path, speed=NARRATION_SPEED):
-    """Generate TTS audio using gTTS with the selected voice, then speed it up."""
+def generate_tts(text, voice_key, output_path):
+    """
+    Generate TTS audio using gTTS with the selected voice, at natural
+    speed; the NARRATION_SPEED speed-up happens in the final mux.
+    """
     voice = VOICE_OPTIONS.get(voice_key, VOICE_OPTIONS["1"])
     tts = gTTS(text=text, lang=voice["lang"], tld=voice["tld"])
-    raw_path = output_path + ".raw.mp3"
-    tts.save(raw_path)
-    if speed != 1.0:
-        _speed_up_audio(raw_path, output_path, speed=speed)
-        try:
-            os.remove(raw_path)
-        except Exception:
-            pass
-    else:
-        os.rename(raw_path, output_path)
+    tts.save(output_path)
     return output_path
 
 
+# Whisper expects 16 kHz mono float32
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_MODEL = "base"
+# Transcripts keyed by (audio content, model), so re-rendering the same
+# narration skips the model entirely
+WHISPER_CACHE_DIR = os.path.join(BACKEND_DIR, '.whisper_cache')
+
+# Subtitle timing source. gTTS speaks our own text, so by default word
+# timings are estimated from the audio length; set USE_WHISPER=1 to align
+# them with a Whisper transcription instead (slower, needs faster-whisper).
+USE_WHISPER = os.getenv("USE_WHISPER", "").lower() in ("1", "true", "yes")
+
+# Extra weight (in characters) for the pause after a sentence or clause
+SENTENCE_PAUSE_WEIGHT = 4
+CLAUSE_PAUSE_WEIGHT = 2
+
 _whisper_model = None
 
 def _get_whisper_model():
     """Load Whisper model once and cache it."""
     global _whisper_model
     if _whisper_model is None:
+        # Imported lazily: only needed when USE_WHISPER is on
+        from faster_whisper import WhisperModel
         print("  Loading Whisper model (first run only)...")
-        _whisper_model = whisper.load_model("base")
+        # CTranslate2 int8 kernels: same Whisper weights, far faster on CPU
+        kwargs = dict(device="cpu", compute_type="int8", cpu_threads=os.cpu_count() or 4)
+        try:
+            # Skip the Hugging Face Hub round-trip once the model is on disk
+            _whisper_model = WhisperModel(WHISPER_MODEL, local_files_only=True, **kwargs)
+        except Exception:
+            _whisper_model = WhisperModel(WHISPER_MODEL, **kwargs)
     return _whisper_model
 
 
+def preload_models():
+    """
+    Load the Whisper model now instead of inside the first render.
+    Call once per process before rendering (the CLI also uses it as the
+    batch pool's worker initializer); later calls are no-ops. A failure is
+    only reported here: the render retries the load and handles the error.
+    Does nothing unless USE_WHISPER is on.
+    """
+    if not USE_WHISPER:
+        return
+    try:
+        _get_whisper_model()
+    except Exception as e:
+        print(f"  Could not preload Whisper model: {e}")
+
+
 def transcribe_with_whisper(audio_path):
     """
     Transcribe audio using Whisper with word-level timestamps.
-    Decodes the MP3 via moviepy (avoids Whisper's ffmpeg subprocess which
-    fails when ffmpeg is not on PATH). Passes float32 numpy array directly.
-    Returns a flat list of {word, start, end} dicts.
+    Decodes the MP3 with the imageio-ffmpeg binary straight to 16 kHz mono
+    float32 PCM on a pipe (Whisper's own ffmpeg call fails when ffmpeg is
+    not on PATH) and passes the numpy array to the model.
+    Returns a flat list of {word, start, end} dicts, cached on disk by a
+    hash of the audio file.
     """
+    with open(audio_path, 'rb') as f:
+        key = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    cache_path = os.path.join(WHISPER_CACHE_DIR, f"{key}_{WHISPER_MODEL}.json")
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass  # not cached yet (or unreadable); transcribe
+
     model = _get_whisper_model()
 
-    # Decode audio using moviepy's AudioFileClip (uses imageio-ffmpeg binary,
-    # avoids Whisper's own ffmpeg subprocess call which fails on Windows PATH)
-    WHISPER_SR = 16000  # Whisper expects 16 kHz mono float32
-    clip = AudioFileClip(audio_path)
-    native_sr = clip.fps  # e.g. 22050 or 44100
-    # to_soundarray returns (n_samples, n_channels) at native sample rate
-    raw = clip.to_soundarray(fps=native_sr)
-    clip.close()
-
-    # Mix to mono
-    if raw.ndim == 2:
-        mono = raw.mean(axis=1)
-    else:
-        mono = raw
-
-    # Resample from native_sr to WHISPER_SR via linear interpolation
-    original_len = len(mono)
-    target_len = int(original_len * WHISPER_SR / native_sr)
-    x_orig = np.linspace(0, 1, original_len)
-    x_new  = np.linspace(0, 1, target_len)
-    audio_array = np.interp(x_new, x_orig, mono).astype(np.float32)
-
-    # Normalise to [-1, 1] (Whisper expects this range)
-    peak = np.abs(audio_array).max()
-    if peak > 0:
-        audio_array = audio_array / peak
-
-    result = model.transcribe(audio_array, word_timestamps=True, language="en",
-                              fp16=False)
+    # ffmpeg does the decode, downmix and resample in one pass; f32le
+    # samples are already in the [-1, 1] range Whisper expects
+    cmd = [
+        imageio_ffmpeg.get_ffmpeg_exe(), "-nostdin", "-loglevel", "error",
+        "-i", audio_path,
+        "-f", "f32le", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE), "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True, check=True)
+    # Zero-copy view over ffmpeg's output; the model only reads it
+    audio_array = np.frombuffer(proc.stdout, dtype=np.float32)
+
+    # segments is a lazy generator; decoding happens as it is consumed.
+    # Clean TTS speech needs no beam search, temperature fallback or
+    # cross-segment conditioning (which can also loop on hallucinations)
+    segments, _info = model.transcribe(audio_array, word_timestamps=True, language="en",
+                                       vad_filter=True, beam_size=1, best_of=1,
+                                       temperature=0.0, condition_on_previous_text=False,
+                                       no_speech_threshold=0.6, compression_ratio_threshold=2.4)
     words = []
-    for segment in result.get("segments", []):
-        for w in segment.get("words", []):
+    for segment in segments:
+        for w in segment.words or []:
             words.append({
-                "word": w["word"].strip(),
-                "start": w["start"],
-                "end": w["end"],
+                "word": w.word.strip(),
+                "start": w.start,
+                "end": w.end,
             })
+
+    try:
+        os.makedirs(WHISPER_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.part"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(words, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"  Could not cache transcript: {e}")
     return words
 
 
+def estimate_word_timings(text, audio_duration):
+    """
+    Approximate {word, start, end} timings for narration we synthesized
+    ourselves: the audio duration is shared out in proportion to each
+    word's length, plus a little extra after punctuation where TTS pauses.
+    Same output shape as transcribe_with_whisper.
+    """
+    words = text.split()
+    if not words or audio_duration <= 0:
+        return []
+    weights = []
+    for word in words:
+        weight = max(1, len(word))
+        if word.endswith(('.', '!', '?')):
+            weight += SENTENCE_PAUSE_WEIGHT
+        elif word.endswith((',', ';', ':')):
+            weight += CLAUSE_PAUSE_WEIGHT
+        weights.append(weight)
+    sec_per_weight = audio_duration / sum(weights)
+
+    timings = []
+    t = 0.0
+    for word, weight in zip(words, weights):
+        d = weight * sec_per_weight
+        timings.append({"word": word, "start": t, "end": t + d})
+        t += d
+    return timings
+
+
 def build_subtitle_chunks_from_words(whisper_words, max_words_per_chunk=14):
     """
     Group Whisper word-timestamp dicts into subtitle chunks.
@@ -281,30 +368,35 @@ def build_subtitle_chunks_from_words(whisper_words, max_words_per_chunk=14):
     return chunks
 
 
-def _wrap_text(text, font, draw, max_px_width, max_lines=3):
+def _wrap_text(text, font, max_px_width, max_lines=3):
     """
     Word-wrap text so each line fits within max_px_width pixels.
     Returns a list of line strings (at most max_lines).
     All words are always included — if the last line overflows slightly
     that is acceptable to avoid dropping words.
+    Each word is measured once (glyph advance widths) and lines are packed
+    arithmetically, instead of re-measuring the growing line per word.
     """
     words = text.split()
+    space_w = font.getlength(' ')
+    widths = [font.getlength(word) for word in words]
     lines = []
     current = []
+    cur_w = 0.0
 
     for i, word in enumerate(words):
-        test = ' '.join(current + [word])
-        bbox = draw.textbbox((0, 0), test, font=font)
-        w = bbox[2] - bbox[0]
-        if w > max_px_width and current:
+        test_w = cur_w + space_w + widths[i] if current else widths[i]
+        if test_w > max_px_width and current:
             lines.append(' '.join(current))
             if len(lines) >= max_lines - 1:
                 # Last allowed line — absorb ALL remaining words so nothing is dropped
                 current = words[i:]
                 break
             current = [word]
+            cur_w = widths[i]
         else:
             current.append(word)
+            cur_w = test_w
 
     if current:
         lines.append(' '.join(current))
@@ -312,26 +404,37 @@ def _wrap_text(text, font, draw, max_px_width, max_lines=3):
     return lines
 
 
-def _draw_subtitle_image(text, vid_w, font_path, font_size=66, stroke_width=5):
+@functools.lru_cache(maxsize=8)
+def _get_font(font_path, font_size):
+    """Load a TrueType font once per process."""
+    return ImageFont.truetype(font_path, font_size)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_line_height(font_path, font_size, stroke_width):
+    """Height of one subtitle line, measured on a tall reference string."""
+    # The font measures text itself; no scratch image or Draw needed
+    ref_bbox = _get_font(font_path, font_size).getbbox('Agpqy', stroke_width=stroke_width)
+    return ref_bbox[3] - ref_bbox[1]
+
+
+def _draw_subtitle_image(text, vid_w, font_path, font_size=SUBTITLE_FONT_SIZE, stroke_width=5):
     """
     Render a subtitle string to a transparent RGBA numpy array using PIL.
     Properly word-wraps into up to 3 lines within safe horizontal margins.
     Drawn once per chunk — far faster than TextClip which redraws every frame.
     """
-    font = ImageFont.truetype(font_path, font_size)
+    font = _get_font(font_path, font_size)
 
     # Safe horizontal margins: 80px each side inside the 1080px frame
     H_MARGIN = 80
     box_w = vid_w - (H_MARGIN * 2)
 
-    # Measure line height using a tall reference character
-    dummy_img = Image.new('RGBA', (box_w, 10))
-    dummy_draw = ImageDraw.Draw(dummy_img)
-    ref_bbox = dummy_draw.textbbox((0, 0), 'Agpqy', font=font, stroke_width=stroke_width)
-    line_h = ref_bbox[3] - ref_bbox[1]
+    # Measure line height using a tall reference character (cached per font)
+    line_h = _get_line_height(font_path, font_size, stroke_width)
     line_spacing = int(line_h * 0.25)  # 25% extra between lines
 
-    lines = _wrap_text(text, font, dummy_draw, box_w, max_lines=3)
+    lines = _wrap_text(text, font, box_w, max_lines=3)
     n_lines = len(lines)
 
     # Total image height: lines + spacing + top/bottom padding for descenders
@@ -343,37 +446,49 @@ def _draw_subtitle_image(text, vid_w, font_path, font_size=66, stroke_width=5):
 
     y = V_PAD
     for line in lines:
-        lb = draw.textbbox((0, 0), line, font=font, stroke_width=stroke_width)
+        lb = font.getbbox(line, stroke_width=stroke_width)
         line_w = lb[2] - lb[0]
         x = (box_w - line_w) // 2  # center each line
 
-        # Black stroke/outline
+        # White fill with black stroke/outline in one rasterization pass
         draw.text((x, y), line, font=font,
-                  fill=(0, 0, 0, 255),
+                  fill=(255, 255, 255, 255),
                   stroke_width=stroke_width,
                   stroke_fill=(0, 0, 0, 255))
-        # White fill
-        draw.text((x, y), line, font=font, fill=(255, 255, 255, 255))
 
         y += line_h + line_spacing
 
-    return np.array(img)
+    # Read-only view of the pixels; nothing downstream writes to it
+    return np.asarray(img)
 
 
-def build_subtitle_clips(whisper_chunks, audio_duration, vid_w, vid_h):
+def write_subtitle_track(whisper_chunks, audio_duration, vid_w, out_dir):
     """
-    Build ImageClip subtitle objects from Whisper word-timestamp chunks.
+    Render subtitle chunks to PNGs in out_dir and write an ffmpeg concat
+    list that shows each one from its start until the next chunk starts.
     Each chunk has exact {text, start, end} from real audio timestamps.
-    Clips are strictly non-overlapping: each end == next start.
-    Positioned at 85% down the screen.
+    Images are padded to one common size so ffmpeg sees a single stream.
+    Returns (list_path, width, height), or None when there are no chunks.
     """
     if not whisper_chunks:
-        return []
-
-    subtitle_y = int(vid_h * 0.85) - 40
-    clips = []
+        return None
 
-    for i, chunk in enumerate(whisper_chunks):
+    frames = [_draw_subtitle_image(chunk["text"], vid_w, FONT_PATH) for chunk in whisper_chunks]
+    width = max(f.shape[1] for f in frames)
+    height = max(f.shape[0] for f in frames)
+
+    def save(name, frame=None):
+        canvas = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        if frame is not None:
+            img = Image.fromarray(frame)
+            canvas.paste(img, ((width - img.width) // 2, 0))
+        canvas.save(os.path.join(out_dir, name), compress_level=1)
+        return name
+
+    entries = []
+    if whisper_chunks[0]["start"] > 0:
+        entries.append((save("sub_blank.png"), whisper_chunks[0]["start"]))
+    for i, (chunk, frame) in enumerate(zip(whisper_chunks, frames)):
         start = chunk["start"]
         # End = next chunk's start (hard cut, no overlap), or audio end
         if i + 1 < len(whisper_chunks):
@@ -381,96 +496,145 @@ def build_subtitle_clips(whisper_chunks, audio_duration, vid_w, vid_h):
         else:
             end = audio_duration
         end = max(end, start + 0.05)  # minimum 50ms safety
+        entries.append((save(f"sub_{i:04d}.png", frame), end - start))
+
+    list_path = os.path.join(out_dir, "subtitles.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for name, duration in entries:
+            f.write(f"file '{name}'\nduration {duration:.3f}\n")
+        # The concat demuxer ignores the last entry's duration unless repeated
+        f.write(f"file '{entries[-1][0]}'\n")
+    return list_path, width, height
+
+
+def _probe_duration(path):
+    """Read a media file's duration from ffmpeg's stream info (imageio-ffmpeg has no ffprobe)."""
+    result = subprocess.run(
+        [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-i", path],
+        capture_output=True, text=True, errors="replace"
+    )
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr)
+    if not match:
+        raise ValueError(f"Could not read duration of {path}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+# H.264 encoder settings, preferred first. NVENC offloads encoding to the
+# GPU; libx264 is tuned for our low-motion background + static captions.
+VIDEO_ENCODERS = {
+    "h264_nvenc": ["-c:v", "h264_nvenc", "-preset", "p1", "-rc", "vbr", "-cq", "28"],
+    "libx264": ["-c:v", "libx264", "-preset", "ultrafast", "-tune", "fastdecode", "-crf", "26"],
+}
 
-        frame = _draw_subtitle_image(chunk["text"], vid_w, FONT_PATH)
-        clip = (
-            ImageClip(frame, is_mask=False)
-            .with_start(start)
-            .with_end(end)
-            .with_position(('center', subtitle_y))
-        )
-        clips.append(clip)
-
-    return clips
-
-
-def crop_to_916(clip):
-    """Crop clip to 9:16 aspect ratio, center-cropped."""
-    target_ratio = 9 / 16
-    w, h = clip.size
-    current_ratio = w / h
+_video_encoder = None
 
-    if current_ratio > target_ratio:
-        new_w = int(h * target_ratio)
-        x1 = (w - new_w) // 2
-        return clip.cropped(x1=x1, x2=x1 + new_w)
-    else:
-        new_h = int(w / target_ratio)
-        y1 = (h - new_h) // 2
-        return clip.cropped(y1=y1, y2=y1 + new_h)
+def _get_video_encoder():
+    """Detect the best available H.264 encoder once and cache it."""
+    global _video_encoder
+    if _video_encoder is None:
+        result = subprocess.run(
+            [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-encoders"],
+            capture_output=True, text=True, errors="replace"
+        )
+        available = set(re.findall(r"^\s*V\S*\s+(\S+)", result.stdout, re.MULTILINE))
+        _video_encoder = next((e for e in VIDEO_ENCODERS if e in available), "libx264")
+    return _video_encoder
 
 
 def _render_single_video(narration_text, voice_key, bg_video_path, output_path):
     """
     Core render: TTS + subtitles + background -> one MP4 file.
+    Everything after TTS runs as a single ffmpeg graph: seek into the
+    background, center-crop to 9:16, scale, overlay the subtitle PNGs,
+    speed up and mux the narration, and encode. No frame ever passes
+    through Python.
     Returns output_path on success, None on failure.
     """
-    audio_path = os.path.join(BACKEND_DIR, '_temp_narration.mp3')
-    audio_clip = None
-    final = None
-    try:
-        generate_tts(narration_text, voice_key, audio_path)
-        audio_clip = AudioFileClip(audio_path)
-        audio_duration = audio_clip.duration
-
-        bg = VideoFileClip(bg_video_path)
-        if bg.duration < audio_duration:
-            loops = int(audio_duration / bg.duration) + 1
-            bg = concatenate_videoclips([bg] * loops)
-        max_start = max(0, bg.duration - audio_duration)
-        start = random.uniform(0, max_start)
-        bg = bg.subclipped(start, start + audio_duration)
-        bg = crop_to_916(bg)
-        bg = bg.resized((OUTPUT_WIDTH, OUTPUT_HEIGHT))
-
-        # Whisper transcription for exact word-level timestamps
-        print("  Transcribing audio for subtitle sync...")
-        whisper_words = transcribe_with_whisper(audio_path)
-        whisper_chunks = build_subtitle_chunks_from_words(whisper_words)
-        subtitle_clips = build_subtitle_clips(whisper_chunks, audio_duration, OUTPUT_WIDTH, OUTPUT_HEIGHT)
-
-        final = CompositeVideoClip([bg] + subtitle_clips, size=(OUTPUT_WIDTH, OUTPUT_HEIGHT))
-        final = final.with_audio(audio_clip)
-        final = final.with_duration(audio_duration)
-
-        final.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac',
-            fps=30,
-            threads=8,
-            preset='ultrafast',
-            logger=None
-        )
-        return output_path
-    except Exception as e:
-        print(f"  Render error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-    finally:
-        if audio_clip:
-            try: audio_clip.close()
-            except Exception: pass
-        if final:
-            try: final.close()
-            except Exception: pass
-        if os.path.exists(audio_path):
-            try: os.remove(audio_path)
-            except Exception: pass
-
-
-def generate_video(story, voice_key, bg_video_filename, output_filename=None, max_seconds=120, allow_split=False):
+    global _video_encoder
+    with tempfile.TemporaryDirectory(prefix="t2t_render_") as work_dir:
+        try:
+            audio_path = os.path.join(work_dir, "narration.mp3")
+            # gTTS is a network round-trip; probe the background meanwhile
+            with ThreadPoolExecutor(max_workers=1) as ex:
+                tts_future = ex.submit(generate_tts, narration_text, voice_key, audio_path)
+                bg_duration = _probe_duration(bg_video_path)
+                tts_future.result()
+            # The speed-up is applied while muxing, so the video runs for
+            # the sped-up length and subtitle times are scaled to match
+            audio_duration = _probe_duration(audio_path) / NARRATION_SPEED
+
+            # Random slice of the background; loop it when it is too short
+            if bg_duration >= audio_duration:
+                start = random.uniform(0, bg_duration - audio_duration)
+                loop_args = []
+            else:
+                # Loop the input indefinitely; -t below cuts it at the narration length
+                start = random.uniform(0, bg_duration)
+                loop_args = ["-stream_loop", "-1"]
+
+            if USE_WHISPER:
+                # Whisper transcription for exact word-level timestamps
+                print("  Transcribing audio for subtitle sync...")
+                whisper_words = [
+                    {"word": w["word"], "start": w["start"] / NARRATION_SPEED, "end": w["end"] / NARRATION_SPEED}
+                    for w in transcribe_with_whisper(audio_path)
+                ]
+            else:
+                whisper_words = estimate_word_timings(narration_text, audio_duration)
+            whisper_chunks = build_subtitle_chunks_from_words(whisper_words)
+            track = write_subtitle_track(whisper_chunks, audio_duration, OUTPUT_WIDTH, work_dir)
+
+            # Center-crop to 9:16 (crop centers by default), then scale
+            video_filter = (
+                "[0:v]crop='min(iw,ih*9/16)':'min(ih,iw*16/9)',"
+                f"scale={OUTPUT_WIDTH}:{OUTPUT_HEIGHT},setsar=1"
+            )
+            cmd = [
+                imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+                *loop_args, "-ss", f"{start:.3f}", "-i", bg_video_path,
+                "-i", audio_path,
+            ]
+            if track:
+                list_path, sub_w, _ = track
+                subtitle_y = int(OUTPUT_HEIGHT * 0.85) - 40
+                cmd += ["-f", "concat", "-safe", "0", "-i", list_path]
+                video_filter += (
+                    f"[bg];[bg][2:v]overlay=x={(OUTPUT_WIDTH - sub_w) // 2}:y={subtitle_y}:format=auto[v]"
+                )
+            else:
+                video_filter += "[v]"
+            cmd += [
+                "-filter_complex", video_filter,
+                "-map", "[v]", "-map", "1:a",
+                "-t", f"{audio_duration:.3f}",
+                "-r", "30", "-pix_fmt", "yuv420p",
+                "-filter:a", _atempo_filter(), "-c:a", "aac", "-movflags", "+faststart",
+            ]
+            encoder = _get_video_encoder()
+            try:
+                subprocess.run(cmd + VIDEO_ENCODERS[encoder] + [output_path], check=True, capture_output=True)
+            except subprocess.CalledProcessError:
+                if encoder == "libx264":
+                    raise
+                # The encoder is compiled in but unusable here (e.g. no GPU)
+                print(f"  Hardware encoder {encoder} failed, falling back to libx264")
+                _video_encoder = "libx264"
+                subprocess.run(cmd + VIDEO_ENCODERS["libx264"] + [output_path], check=True, capture_output=True)
+            return output_path
+        except subprocess.CalledProcessError as e:
+            print(f"  Render error: ffmpeg failed: {e.stderr.decode(errors='replace').strip()}")
+            return None
+        except Exception as e:
+            print(f"  Render error: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+
+def generate_video(story, voice_key, bg_video_filename, output_filename=None, max_seconds=120, allow_split=False,
+                   workers=None):
     """
     Full pipeline: TTS -> subtitles -> video composition.
 
@@ -479,6 +643,9 @@ def generate_video(story, voice_key, bg_video_filename, output_filename=None, ma
       - Always outputs exactly 1 video.
     If allow_split is True (under-5-min mode):
       - Story is split into numbered parts, each within max_seconds.
+      - Parts render in parallel, up to `workers` at a time
+        (default PART_RENDER_WORKERS); pass workers=1 when the caller
+        already renders several stories at once.
 
     Returns:
         List of output video paths (one per part), or empty list on failure.
@@ -491,11 +658,7 @@ def generate_video(story, voice_key, bg_video_filename, output_filename=None, ma
         return []
 
     # Build and clean narration text
-    narration_text = f"{story['title']}. {story['full_body']}"
-    narration_text = re.sub(r'\*+', '', narration_text)
-    narration_text = re.sub(r'#+\s*', '', narration_text)
-    narration_text = re.sub(r'\[.*?\]\(.*?\)', '', narration_text)
-    narration_text = re.sub(r'\n+', ' ', narration_text).strip()
+    narration_text = clean_markdown(f"{story['title']}. {story['full_body']}")
 
     # Base filename
     if not output_filename:
@@ -522,7 +685,8 @@ def generate_video(story, voice_key, bg_video_filename, output_filename=None, ma
             print(f"  Story fits in one video (~{estimated:.0f}s)")
 
     total = len(parts)
-    output_paths = []
+    jobs = []
+    labels = []
     for i, part_text in enumerate(parts, 1):
         if total > 1:
             part_narration = f"Part {i} of {total}. {part_text}"
@@ -532,8 +696,36 @@ def generate_video(story, voice_key, bg_video_filename, output_filename=None, ma
             fname = f"{output_filename}.mp4"
 
         out = os.path.join(OUTPUT_DIR, fname)
-        print(f"\n  Rendering {'part ' + str(i) + '/' + str(total) if total > 1 else 'video'}: {fname}")
-        result = _render_single_video(part_narration, voice_key, bg_video_path, out)
+        jobs.append((part_narration, voice_key, bg_video_path, out))
+        labels.append(f"{'part ' + str(i) + '/' + str(total) if total > 1 else 'video'}: {fname}")
+
+    results = [None] * total
+    workers = min(total, PART_RENDER_WORKERS if workers is None else workers)
+    if workers > 1:
+        # Parts are independent; each worker loads Whisper once up front
+        with ProcessPoolExecutor(max_workers=workers, initializer=preload_models) as pool:
+            futures = {}
+            for i, job in enumerate(jobs):
+                print(f"\n  Queued {labels[i]}")
+                futures[pool.submit(_render_single_video, *job)] = i
+            # Report parts as they finish, which may not be in order
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    # A crashed worker (BrokenProcessPool) fails every pending part
+                    print(f"  Render error in part {i + 1}: {e}")
+                    continue
+                if results[i]:
+                    print(f"  Finished {labels[i]}")
+    else:
+        for i, job in enumerate(jobs):
+            print(f"\n  Rendering {labels[i]}")
+            results[i] = _render_single_video(*job)
+
+    output_paths = []
+    for i, result in enumerate(results, 1):
         if result:
             output_paths.append(result)
         else: